@@ -4,11 +4,14 @@ import sys
 import subprocess
 import os
 import os.path
-import glob
 import argparse
 import fnmatch
 import shutil
+import shlex
 import time
+import string
+import concurrent.futures
+import multiprocessing
 
 # In case of error       :
 #       [SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed: unable to get local issuer certificate (_ssl.c:997)>
@@ -52,88 +55,105 @@ else:
     BOARD = "ESP32CAM"
 PYCAMERESP_DIR = os.path.abspath(os.path.normpath(os.path.dirname(__file__)))
 
-GET_COMMANDS = """
+# Variables which can be used in commands
+SUBSTITUTIONS = ["OUTPUT_DIR", "BOARD", "PIP", "PYCAMERESP_DIR", "MICROPYTHON_VERSION", "ESP_IDF_VERSION", "ESP32_CAMERA_VERSION", "ESP32_CAMERA_VERSION_S3"]
+
+GET_COMMANDS = string.Template("""
+
+#########################################
+# Get micropython, espressif and camera #
+#########################################
+mkdir "${OUTPUT_DIR}"
+cd "${OUTPUT_DIR}"
+# PARALLEL_BLOCK_START
+proxychains git clone --no-checkout --filter=blob:none https://github.com/micropython/micropython.git
+proxychains git clone ${ESP_IDF_VERSION} --single-branch --filter=blob:none --recursive --shallow-submodules https://github.com/espressif/esp-idf.git
+proxychains git clone --no-checkout --filter=blob:none https://github.com/espressif/esp32-camera.git esp32-camera
+# PARALLEL_BLOCK_END
 
 ###################
 # Get micropython #
 ###################
-mkdir "%(OUTPUT_DIR)s"
-cd "%(OUTPUT_DIR)s"
-proxychains git clone https://github.com/micropython/micropython.git
-cd "%(OUTPUT_DIR)s/micropython"
-git checkout %(MICROPYTHON_VERSION)s
-cd "%(OUTPUT_DIR)s/micropython/ports/esp32"
-proxychains git submodule update --init --recursive
-
-#################
-# Get espressif #
-#################
-cd "%(OUTPUT_DIR)s"
-proxychains git clone %(ESP_IDF_VERSION)s --recursive https://github.com/espressif/esp-idf.git
+cd "${OUTPUT_DIR}/micropython"
+git checkout ${MICROPYTHON_VERSION}
+cd "${OUTPUT_DIR}/micropython/ports/esp32"
+proxychains git submodule update --init --recursive --depth 1 --jobs $(nproc)
 
 ##############
 # Get camera #
 ##############
-cd "%(OUTPUT_DIR)s"
-proxychains git clone https://github.com/espressif/esp32-camera.git esp32-camera
-cd "%(OUTPUT_DIR)s/esp32-camera"
-git checkout %(ESP32_CAMERA_VERSION)s
+cd "${OUTPUT_DIR}/esp32-camera"
+git checkout ${ESP32_CAMERA_VERSION}
 
-cd "%(OUTPUT_DIR)s/esp-idf/components"
-ln -s "%(OUTPUT_DIR)s/esp32-camera" esp32-camera"""
+cd "${OUTPUT_DIR}/esp-idf/components"
+ln -sfn "${OUTPUT_DIR}/esp32-camera" esp32-camera""")
 
-BUILD_DOC_COMMANDS = '''
+BUILD_DOC_COMMANDS = string.Template('''
 
 #############
 # Build Doc #
 #############
-cd %(PYCAMERESP_DIR)s/modules/lib
+cd ${PYCAMERESP_DIR}/modules/lib
 export PYTHONPATH=../simul;pdoc3 --html -o ../../doc --force .
-'''
+''')
 
-BUILD_COMMANDS = '''
+# Commands shared by all boards, executed once before the boards builds
+PREPARE_BUILD_COMMANDS = string.Template('''
 
 #####################
 # Set env espressif #
 #####################
-cd "%(OUTPUT_DIR)s/esp-idf"
+cd "${OUTPUT_DIR}/esp-idf"
 proxychains bash install.sh
 source ./export.sh
 
 ###################
 # Build mpy-cross #
 ###################
-cd "%(OUTPUT_DIR)s/micropython"
+cd "${OUTPUT_DIR}/micropython"
 make -C mpy-cross
 
+###########################
+# Get micropython modules #
+###########################
+cd "${OUTPUT_DIR}/micropython/ports/esp32"
+make submodules
+''')
+
+# Commands executed for each board, several boards can be built at the same time
+BUILD_COMMANDS = string.Template('''
+
 #####################
 # Build micropython #
 #####################
-cd "%(OUTPUT_DIR)s/micropython/ports/esp32"
-make submodules
-make BOARD=%(BOARD)s
-cp "%(OUTPUT_DIR)s/micropython/ports/esp32/build-%(BOARD)s/firmware.bin" "%(PYCAMERESP_DIR)s/delivery/%(BOARD)s-firmware.bin"
+cd "${OUTPUT_DIR}/micropython/ports/esp32"
+make BOARD=${BOARD}
+''')
+
+# Commands that write in the delivery directory, they must not run at the same time for several boards
+DELIVERY_COMMANDS = string.Template('''
 
 ####################
 # Build distri zip #
 ####################
-cd %(PYCAMERESP_DIR)s
-python3 "%(PYCAMERESP_DIR)s/scripts/zip_mpy.py" "%(OUTPUT_DIR)s" "%(BOARD)s" "%(PYCAMERESP_DIR)s"
-'''
+cp "${OUTPUT_DIR}/micropython/ports/esp32/build-${BOARD}/firmware.bin" "${PYCAMERESP_DIR}/delivery/${BOARD}-firmware.bin"
+cd ${PYCAMERESP_DIR}
+python3 "${PYCAMERESP_DIR}/scripts/zip_mpy.py" "${OUTPUT_DIR}" "${BOARD}" "${PYCAMERESP_DIR}"
+''')
 
-PATCH_COMMANDS = '''
+PATCH_COMMANDS = string.Template('''
 
 ############################
 # Patch source Micropython #
 ############################
-cp -f -r -v -p "%(PYCAMERESP_DIR)s/patch/c/micropython/"*       "%(OUTPUT_DIR)s/micropython"
-cp -f -r -v -p "%(PYCAMERESP_DIR)s/patch/python/micropython/"*  "%(OUTPUT_DIR)s/micropython"
-cp -f -r -v -p "%(PYCAMERESP_DIR)s/modules/lib/"*               "%(OUTPUT_DIR)s/micropython/ports/esp32/modules"
-cd %(PYCAMERESP_DIR)s
-python3        "%(PYCAMERESP_DIR)s/scripts/patchInisetup.py"    "%(OUTPUT_DIR)s"
-'''
+cp -f -r -v -p "${PYCAMERESP_DIR}/patch/c/micropython/"*       "${OUTPUT_DIR}/micropython"
+cp -f -r -v -p "${PYCAMERESP_DIR}/patch/python/micropython/"*  "${OUTPUT_DIR}/micropython"
+cp -f -r -v -p "${PYCAMERESP_DIR}/modules/lib/"*               "${OUTPUT_DIR}/micropython/ports/esp32/modules"
+cd ${PYCAMERESP_DIR}
+python3        "${PYCAMERESP_DIR}/scripts/patchInisetup.py"    "${OUTPUT_DIR}"
+''')
 
-INSTALL_TOOLS_COMMANDS = '''
+INSTALL_TOOLS_COMMANDS = string.Template('''
 
 #######################
 # Install linux tools #
@@ -153,71 +173,128 @@ sudo pacman -S cmake           --noconfirm
 ############################
 # Install python libraries #
 ############################
-pip%(PIP)s install pyqt6
-pip%(PIP)s install pyinstaller
-pip%(PIP)s install esptool
-pip%(PIP)s install --upgrade esptool
-pip%(PIP)s install pyserial
-pip%(PIP)s install requests
-pip%(PIP)s install pdoc3
-'''
+pip${PIP} install --upgrade pyqt6 pyinstaller esptool pyserial requests pdoc3
+''')
 
-CLEAN_COMMANDS = '''
+CLEAN_MICROPYTHON_COMMANDS = string.Template('''
 
 #######################
-# Cleanup all sources #
+# Cleanup micropython #
 #######################
-cd "%(OUTPUT_DIR)s/micropython"
+cd "${OUTPUT_DIR}/micropython"
 proxychains git fetch --all
 git reset --hard 
 git clean -fdx
-git checkout %(MICROPYTHON_VERSION)s
-cd "%(OUTPUT_DIR)s/micropython/ports/esp32"
+git checkout ${MICROPYTHON_VERSION}
+cd "${OUTPUT_DIR}/micropython/ports/esp32"
 proxychains git submodule update --init --recursive
+''')
 
-cd "%(OUTPUT_DIR)s/esp32-camera"
+CLEAN_CAMERA_COMMANDS = string.Template('''
+
+##################
+# Cleanup camera #
+##################
+cd "${OUTPUT_DIR}/esp32-camera"
 proxychains git fetch --all
 git reset --hard 
 git clean -fdx
-git checkout %(ESP32_CAMERA_VERSION)s
+git checkout ${ESP32_CAMERA_VERSION}
+''')
+
+CLEAN_ESP_IDF_COMMANDS = string.Template('''
 
-cd "%(OUTPUT_DIR)s/esp-idf"
+#####################
+# Cleanup espressif #
+#####################
+cd "${OUTPUT_DIR}/esp-idf"
 proxychains git fetch --all
 git reset --hard 
 git clean -fdx
-git checkout %(ESP_IDF_VERSION)s
+git checkout ${ESP_IDF_VERSION}
+''')
+
+CLEAN_COMMANDS = string.Template('''
 
-cd "%(OUTPUT_DIR)s/esp-idf/components"
-ln -s "%(OUTPUT_DIR)s/esp32-camera" esp32-camera
-'''
+cd "${OUTPUT_DIR}/esp-idf/components"
+ln -sfn "${OUTPUT_DIR}/esp32-camera" esp32-camera
+''')
 
 # Presence of an old unused camera component version in the firmware, causes a problem to rebuild GENERIC_S3.
 # This patch switch to recent version.
-S3_PATCH_COMMANDS = '''
+S3_PATCH_COMMANDS = string.Template('''
 
 #############################################
 # Replace Camera version for build ESP32 S3 #
 #############################################
-cd "%(OUTPUT_DIR)s/esp32-camera"
-git checkout %(ESP32_CAMERA_VERSION_S3)s
-'''
+cd "${OUTPUT_DIR}/esp32-camera"
+git checkout ${ESP32_CAMERA_VERSION_S3}
+''')
+
+
+# Environment variables set by export.sh of espressif, indexed by IDF_PATH
+environments = {}
+
+
+def source_environment(idf_path):
+    """ Get the environment variables set by the espressif export.sh, the result is cached """
+    environment = environments.get(idf_path)
+    if environment is None:
+        environment = {}
+        os.environ["IDF_PATH"] = idf_path
+        pipe = subprocess.Popen(""". ./export.sh; env""", stdout=subprocess.PIPE, shell=True)
+        lines = pipe.communicate()[0]
+        for line in lines.split(b"\n"):
+            try:
+                key, value = line.split(b"=")
+                environment[key.decode("utf8")] = value.decode("utf8")
+            except:
+                pass
+        environments[idf_path] = environment
+    return environment
+
+
+def execute(commands, context=None):
+    """ Execute shell commands template, the context overrides the global variables used in commands """
+    variables = {name:globals()[name] for name in SUBSTITUTIONS}
+    if context is not None:
+        variables.update(context)
+    commands = commands.safe_substitute(variables)
+    parallel = None
+    script = []
+
+    def run_script():
+        """ Run all consecutive shell commands with a single bash """
+        if len(script) > 0:
+            sys.stdout.flush()
+            subprocess.Popen(["bash", "-c", "\n".join(script)], stdout=sys.stdout, stderr=sys.stderr).communicate()
+            script.clear()
 
-
-def execute(commands):
-    """ Execute shell commands """
-    commands = commands % globals()
     for command in commands.split("\n"):
         command = command.strip()
-        if len(command) >= 1 and command[0] == "#":
+        if command == "# PARALLEL_BLOCK_START":
+            run_script()
+            parallel = []
+        elif command == "# PARALLEL_BLOCK_END":
+            for pipe in parallel:
+                pipe.communicate()
+            parallel = None
+        elif len(command) >= 1 and command[0] == "#":
+            run_script()
             print(COLOR_1 + command + NO_COLOR)
         elif command.strip() != "":
-            print(COLOR_2 + "> " + command + NO_COLOR)
+            echo = COLOR_2 + "> " + command + NO_COLOR
             command = command.replace("\t", " ")
             cmds = command.split(" ")
             cmd = []
             for part in cmds:
                 if len(part) > 0:
                     cmd.append(part)
+            builtin = cmd[0] in ("cd", "removetree", "removedir", "copyfile", "copytree", "copydir", "remove", "source")
+            if builtin:
+                run_script()
+            if builtin or parallel is not None:
+                print(echo)
             if cmd[0] == "cd":
                 command = command.strip()
                 current_dir = command[3:].strip()
@@ -240,26 +317,78 @@ def execute(commands):
             elif cmd[0] == "remove":
                 os.remove(cmd[1])
             elif cmd[0] == "source":
-                os.environ["IDF_PATH"] = OUTPUT_DIR + os.sep + "esp-idf"
-                pipe = subprocess.Popen(""". ./export.sh; env""", stdout=subprocess.PIPE, shell=True)
-                lines = pipe.communicate()[0]
-                for line in lines.split(b"\n"):
-                    try:
-                        key, value = line.split(b"=")
-                        os.environ[key.decode("utf8")] = value.decode("utf8")
-                    except:
-                        pass
+                os.environ.update(source_environment(variables["OUTPUT_DIR"] + os.sep + "esp-idf"))
+            elif parallel is not None:
+                # Commands of a parallel block are awaited at the end of the block
+                parallel.append(subprocess.Popen(["bash", "-c", command], stdout=sys.stdout, stderr=sys.stderr))
             else:
-                pipe = subprocess.Popen(command, stdout=sys.stdout, stderr=sys.stderr, shell=True)
-                lines = pipe.communicate()[0]
+                # The command is displayed by bash, just before its own output
+                script.append("printf '%%s\\n' %s" % shlex.quote(echo))
+                script.append(command)
         else:
             print("")
+    run_script()
+
+
+def is_clean(repository, version, excluded=None):
+    """ Indicates if the git repository is already on the version without any modification, the excluded path is not checked """
+    def git(*args):
+        return subprocess.run(["git", "-C", repository] + list(args), capture_output=True, check=True).stdout.strip()
+    try:
+        head = git("rev-parse", "HEAD")
+        expected = git("rev-parse", version.split(" ")[-1] + "^{commit}")
+        if excluded is None:
+            status = git("status", "--porcelain")
+        else:
+            status = git("status", "--porcelain", "--", ".", ":(exclude)" + excluded)
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return head == expected and status == b""
+
+
+def clean_sources():
+    """ Clean the sources, the repositories already on their version without modification are not fetched """
+    # The camera link added into esp-idf by CLEAN_COMMANDS is not a modification
+    repositories = [
+        ("micropython",  MICROPYTHON_VERSION,  CLEAN_MICROPYTHON_COMMANDS, None),
+        ("esp32-camera", ESP32_CAMERA_VERSION, CLEAN_CAMERA_COMMANDS,      None),
+        ("esp-idf",      ESP_IDF_VERSION,      CLEAN_ESP_IDF_COMMANDS,     "components/esp32-camera")]
+    for directory, version, commands, excluded in repositories:
+        if is_clean(OUTPUT_DIR + os.sep + directory, version, excluded):
+            print(COLOR_1 + "# %s already clean" % directory + NO_COLOR)
+        else:
+            execute(commands)
+    execute(CLEAN_COMMANDS)
+
+
+def build_board(board, output_dir, delivery_lock):
+    """ Build the firmware of one board, executed in a separate process """
+    context = {"BOARD":board, "OUTPUT_DIR":output_dir}
+    print(COLOR_3 + "*" * 30 + NO_COLOR)
+    print(COLOR_3 + "*" * 30 + NO_COLOR)
+    print(COLOR_3 + board + NO_COLOR)
+    print(COLOR_3 + "*" * 30 + NO_COLOR)
+    print(COLOR_3 + "*" * 30 + NO_COLOR)
+    execute(BUILD_COMMANDS, context)
+    with delivery_lock:
+        execute(DELIVERY_COMMANDS, context)
+    return board
+
+
+def build_boards(boards, jobs):
+    """ Build the firmwares of selected boards in parallel """
+    execute(PREPARE_BUILD_COMMANDS)
+    with multiprocessing.Manager() as manager:
+        delivery_lock = manager.Lock()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(build_board, board, OUTPUT_DIR, delivery_lock) for board in boards]
+            for future in concurrent.futures.as_completed(futures):
+                print(COLOR_3 + "%s built" % future.result() + NO_COLOR)
 
 
 def main():
     """ Build pycameresp firmwares """
     global OUTPUT_DIR
-    global BOARD
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--install", help="install the tools required to build the firmware (linux only)", action="store_true")
     parser.add_argument("-g", "--get", help="get micropython source from git", action="store_true")
@@ -270,6 +399,7 @@ def main():
     parser.add_argument("-c", "--clean", help="clean micropython sources to remove all patch", action="store_true")
     parser.add_argument("-s", "--s3", help="build Esp32 S3 without problem", action="store_true")
     parser.add_argument("-o", "--outputdir", help="output directory")
+    parser.add_argument("-j", "--jobs", help="number of boards built at the same time", type=int, default=max(1, (os.cpu_count() or 2)//2))
     parser.add_argument('boards', metavar='boards', type=str, help='Select boards to build micropython firmwares, for all firmwares use "*"', nargs="*")
     args = parser.parse_args()
     if len(args.boards) == 0:
@@ -290,7 +420,7 @@ def main():
                 print("Get sources already done")
 
         if args.clean or args.s3 or args.all:
-            execute(CLEAN_COMMANDS)
+            clean_sources()
 
         if args.s3:
             execute(S3_PATCH_COMMANDS)
@@ -302,19 +432,14 @@ def main():
             execute(PATCH_COMMANDS)
 
         if args.build or args.all:
-            board_dir = OUTPUT_DIR + os.path.sep + "micropython/ports/esp32/boards" + os.sep + "*"
-            for board in glob.glob(board_dir):
-                if os.path.isdir(board):
-                    board = os.path.split(board)[1]
-                    for selected_board in args.boards:
-                        if fnmatch.fnmatch(board, selected_board):
-                            BOARD = board
-                            print(COLOR_3 + "*" * 30 + NO_COLOR)
-                            print(COLOR_3 + "*" * 30 + NO_COLOR)
-                            print(COLOR_3 + BOARD + NO_COLOR)
-                            print(COLOR_3 + "*" * 30 + NO_COLOR)
-                            print(COLOR_3 + "*" * 30 + NO_COLOR)
-                            execute(BUILD_COMMANDS)
+            board_dir = OUTPUT_DIR + os.path.sep + "micropython/ports/esp32/boards"
+            with os.scandir(board_dir) as entries:
+                names = [entry.name for entry in entries if entry.is_dir()]
+            boards = set()
+            for selected_board in args.boards:
+                boards.update(fnmatch.filter(names, selected_board))
+            if len(boards) > 0:
+                build_boards(sorted(boards), args.jobs)
 
 
 if __name__ == "__main__":
@@ -120,10 +120,10 @@ class Historic:
 				await Historic.release()
 
 	@staticmethod
-	async def get_json():
-		""" Read the historic from disk """
+	async def get_items():
+		""" Get a copy of the historic items list, the items are not copied """
 		root = Historic.get_root()
-		result = b""
+		result = []
 		if root:
 			try:
 				await Historic.acquire()
@@ -131,7 +131,7 @@ class Historic:
 				Historic.historic.reverse()
 				while len(Historic.historic) > MAX_MOTIONS:
 					del Historic.historic[-1]
-				result = strings.tobytes(json.dumps(Historic.historic))
+				result = Historic.historic[:]
 			except Exception as err:
 				logger.syslog(err)
 			finally:
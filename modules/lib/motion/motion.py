@@ -249,9 +249,9 @@ class Motion:
 			self.image_background.deinit()
 		self.image_background = None
 
-	def open(self):
+	async def open(self):
 		""" Open camera """
-		if video.Camera.open():
+		if await video.Camera.open():
 			return True
 		else:
 			return False
@@ -259,7 +259,7 @@ class Motion:
 	def resume(self):
 		""" Resume the camera, restore the camera configuration after an interruption """
 		video.Camera.framesize(b"%dx%d"%(SnapConfig.get().width, SnapConfig.get().height))
-		video.Camera.pixformat(b"JPEG")
+		video.Camera.pixformat(video.JPEG)
 		video.Camera.quality(self.quality)
 		video.Camera.brightness(0)
 		video.Camera.contrast(0)
@@ -612,7 +612,7 @@ class Detection:
 		# If motion not initialized
 		if self.motion is None:
 			self.motion = Motion(self.motion_config, self.pir_detection)
-			if self.motion.open() is False:
+			if await self.motion.open() is False:
 				self.motion = None
 				raise Exception("Cannot open camera")
 			else:
@@ -11,6 +11,7 @@ It may sound a bit more complicated, but it's a lot quick.
 
 import hashlib
 import time
+import json
 from binascii import hexlify, b2a_base64
 import collections
 import server.stream
@@ -454,6 +455,25 @@ class ContentBuffer:
 			result += await streamio.write(b"Nothing")
 		return result
 
+class ContentJson:
+	""" Class that contains a list of items sent as json array """
+	def __init__(self, items):
+		""" Constructor """
+		self.items = items
+
+	async def serialize(self, streamio):
+		""" Serialize items one by one, without building the whole json """
+		result = await streamio.write(b'Content-Type: application/json\r\n\r\n')
+		separator = b"["
+		for item in self.items:
+			result += await streamio.write(separator)
+			result += await streamio.write(strings.tobytes(json.dumps(item)))
+			separator = b","
+		if separator == b"[":
+			result += await streamio.write(separator)
+		result += await streamio.write(b"]")
+		return result
+
 class PartText:
 	""" Class that contains a text, used in multipart request or response """
 	def __init__(self, name, value):
@@ -560,6 +580,10 @@ class HttpResponse(Http):
 		""" Send a file to the client web browser """
 		return await self.send(content=ContentBuffer(filename, buffer, mimeType), status=b"200", headers=headers)
 
+	async def send_json(self, items, headers=None):
+		""" Send a list of items as json to the client web browser """
+		return await self.send(content=ContentJson(items), status=b"200", headers=headers)
+
 	async def send_page(self, page):
 		""" Send a template page to the client web browser """
 		self.set_content(None)
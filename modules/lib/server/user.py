@@ -4,16 +4,41 @@
 from tools import logger,jsonconfig,encryption,strings,info
 
 EMPTY_PASSWORD = b"e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855" # empty password
+HASH_CACHE_SIZE = 4
+HASH_CACHE_MAX_LENGTH = 64
+
+# Last password hashes computed, only kept in ram, never saved
+hash_cache = []
+
+def get_hash(password):
+	""" Get the hash of the password, the last hashes computed are reused """
+	# All entries are compared in constant time, to not disclose the cached password by timing
+	found = None
+	for index in range(len(hash_cache)):
+		if encryption.compare_digest(hash_cache[index][0], password):
+			found = index
+	if found is not None:
+		# Move the entry to the end, the least recently used is removed first
+		item = hash_cache.pop(found)
+		hash_cache.append(item)
+		return item[1]
+	result = encryption.gethash(password)
+	if len(password) <= HASH_CACHE_MAX_LENGTH:
+		hash_cache.append((bytes(password), result))
+		if len(hash_cache) > HASH_CACHE_SIZE:
+			del hash_cache[0]
+	return result
 
 class UserConfig(jsonconfig.JsonConfig):
-	""" User configuration """
+	""" User configuration, the user is always stored in lowercase """
 	def __init__(self):
 		""" Constructor """
 		jsonconfig.JsonConfig.__init__(self)
 		self.user = b""
 		self.password = EMPTY_PASSWORD
-		if self.load() is False:
-			self.save()
+		# Without file the default user is used, the file is only written by User.change()
+		self.load(errorlog=False)
+		self.user = self.user.lower()
 
 class User:
 	""" Singleton class to manage the user. Only one user can be defined """
@@ -37,13 +62,15 @@ class User:
 	def check(user, password, log=True, display=True):
 		""" Check the user and password """
 		User.init()
-		user = user.lower()
+		if not user.islower():
+			user = user.lower()
+		instance_user = User.instance.user
 
-		if User.instance.user == b"":
+		if instance_user == b"":
 			info.set_last_activity()
 			return True
-		elif user == User.instance.user:
-			if encryption.gethash(password) == User.instance.password:
+		elif user == instance_user:
+			if encryption.compare_digest(get_hash(password), User.instance.password):
 				info.set_last_activity()
 				if log is True:
 					User.login_state[0] = True
@@ -81,6 +108,7 @@ class User:
 		user = user.lower()
 
 		if User.check(user, current_password):
+			del hash_cache[:]
 			if new_password == renew_password:
 				if new_password == b"":
 					User.instance.user     = b""
@@ -2,6 +2,9 @@
 # Copyright (c) 2021 Remi BERTHOLET
 """ Get the wan ip address """
 import random
+import time
+import struct
+import socket
 import uasyncio
 from server.stream import *
 from server.httprequest import *
@@ -21,13 +24,27 @@ async def request(host, port, path):
 		req.set_header(b"Accept"         ,b"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8")
 		req.set_header(b"User-Agent"     ,b"Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.3 Safari/605.1.15")
 		req.set_header(b"Accept-Language",b"fr-FR,fr;q=0.9")
-		req.set_header(b"Accept-Encoding",b"gzip, deflate")
-		req.set_header(b"Connection"     ,b"keep-alive")
+		req.set_header(b"Connection"     ,b"close")
 		await req.send(streamio)
-		response = HttpResponse(streamio)
-		await response.receive(streamio)
-		if response.status == b"200":
-			result = response.get_content().strip()
+
+		# The response is parsed on the fly, only the status and the short content are kept
+		status = (await streamio.readline()).split()
+		if len(status) >= 2 and status[1] == b"200":
+			length = 0
+			while True:
+				header = await streamio.readline()
+				if header in (b"\r\n", b""):
+					break
+				name, value = header.split(b":", 1)
+				if name.strip().lower() == b"content-length":
+					length = int(value)
+			content = b""
+			while len(content) < length:
+				data = await streamio.read(length - len(content))
+				if data == b"":
+					break
+				content += data
+			result = content.strip()
 
 	except Exception as err:
 		logger.syslog(err)
@@ -36,8 +53,61 @@ async def request(host, port, path):
 			await streamio.close()
 	return result
 
-async def get_wan_ip_async():
-	""" Get the wan ip address with asynchronous method """
+STUN_SERVER = ("stun.l.google.com", 19302)
+STUN_MAGIC_COOKIE = 0x2112A442
+STUN_TIMEOUT = 2000
+
+def parse_stun_response(data, transaction):
+	""" Extract the ip address from the STUN binding response """
+	if len(data) >= 20:
+		typ, length, cookie = struct.unpack("!HHL", data[:8])
+		if typ == 0x0101 and cookie == STUN_MAGIC_COOKIE and data[8:20] == transaction:
+			pos = 20
+			while pos + 4 <= min(len(data), 20 + length):
+				attribute, size = struct.unpack("!HH", data[pos:pos+4])
+				value = data[pos+4:pos+4+size]
+				# XOR-MAPPED-ADDRESS or MAPPED-ADDRESS with ipv4 family
+				if attribute in (0x0020, 0x0001) and size >= 8 and value[1] == 0x01:
+					address = value[4:8]
+					if attribute == 0x0020:
+						mask = struct.pack("!L", STUN_MAGIC_COOKIE)
+						address = bytes([address[i] ^ mask[i] for i in range(4)])
+					return b"%d.%d.%d.%d"%(address[0], address[1], address[2], address[3])
+				pos += 4 + ((size + 3) & ~3)
+	return None
+
+async def request_stun(host, port):
+	""" Asynchronous STUN binding request, it returns the ip address seen by the STUN server """
+	result = None
+	sock = None
+	try:
+		transaction = bytes([random.randint(0, 255) for i in range(12)])
+		address = socket.getaddrinfo(host, port, socket.AF_INET)[0][-1]
+		sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		sock.setblocking(False)
+		sock.sendto(struct.pack("!HHL", 0x0001, 0, STUN_MAGIC_COOKIE) + transaction, address)
+		for i in range(STUN_TIMEOUT//50):
+			try:
+				result = parse_stun_response(sock.recv(256), transaction)
+				if result is not None:
+					break
+			except OSError:
+				await uasyncio.sleep_ms(50)
+	except Exception as err:
+		logger.syslog(err)
+	finally:
+		if sock:
+			sock.close()
+	return result
+
+WAN_IP_TTL = 300
+wan_ip_cache = [None, 0]
+
+async def get_wan_ip_async(force=False):
+	""" Get the wan ip address with asynchronous method.
+	The last wan ip is kept WAN_IP_TTL seconds, force=True ignores it """
+	if force is False and wan_ip_cache[0] is not None and time.time() - wan_ip_cache[1] < WAN_IP_TTL:
+		return wan_ip_cache[0]
 	hosts =[
 		("alma.ch"              ,"/myip.cgi"),
 		("api.infoip.io"        ,"/ip"),
@@ -46,8 +116,13 @@ async def get_wan_ip_async():
 		("l2.io"                ,"/ip"),
 		("whatismyip.akamai.com","/")
 	]
-	host, path = hosts[random.randrange(0,len(hosts))]
-	resp = await request(host,80,path)
+	# The STUN request is much lighter than http, which is only used if it fails
+	resp = await request_stun(STUN_SERVER[0], STUN_SERVER[1])
+	if resp is None:
+		host, path = hosts[random.randrange(0,len(hosts))]
+		resp = await request(host,80,path)
 	if resp:
-		return resp.decode("utf-8")
+		wan_ip_cache[0] = resp.decode("utf-8")
+		wan_ip_cache[1] = time.time()
+		return wan_ip_cache[0]
 	return None
@@ -47,13 +47,13 @@ The commands are :
 import sys
 sys.path.append("lib")
 sys.path.append("simul")
-import io
 import os
 import uos
-import machine
 from tools import useful,logger,sdcard,filesystem,exchange,info,strings,terminal,watchdog
 
 stdout_redirected = None
+COPY_BUFFER_SIZE = 4096
+CLEAR_SCREEN = "\x1B[2J\x1B[0;0f"
 
 def print_(message, end=None):
 	""" Redirect the print to file """
@@ -119,16 +119,10 @@ def rmdir(directory, recursive=False, force=False, quiet=False, simulate=False,
 	if recursive is False:
 		removedir(directory, force=force, quiet=quiet, simulate=simulate, ignore_error=ignore_error)
 	else:
-		directories = [directory]
-		d = directory
-		while 1:
-			parts = filesystem.split(d)
-			if parts[1] == "" or parts[0] == "":
-				break
-			directories.append(parts[0])
-			d = parts[0]
-		if "/" in directories:
-			directories.remove("/")
+		# The directory and all its parents, from the deepest, without the empty parts of path
+		parts = [part for part in directory.split("/") if part != ""]
+		root = "/" if directory.startswith("/") else ""
+		directories = [root + "/".join(parts[:i]) for i in range(len(parts), 0, -1)]
 		if sdcard.SdCard.get_mountpoint() in directories:
 			directories.remove(sdcard.SdCard.get_mountpoint())
 		for d in directories:
@@ -142,27 +136,29 @@ def mv(source, destination):
 	except:
 		print_("Cannot mv '%s'->'%s'"%(source,destination))
 
-def copyfile(src,dst,quiet):
-	""" Copy file """
+def copyfile(src,dst,quiet,existing_dirs=None):
+	""" Copy file, existing_dirs is the set of destination directories already checked """
 	dst = dst.replace("//","/")
 	dst = dst.replace("//","/")
 	dstdir, dstfile = filesystem.split(dst)
 	try:
-		if not filesystem.exists(dstdir):
-			if dstdir != "." and dstdir != "":
-				mkdir(dstdir, recursive=True, quiet=quiet)
-		src_file = open(src, 'rb')
-		dst_file = open(dst, 'wb')
-		if quiet is False:
-			print_("cp '%s' -> '%s'"%(src,dst))
-		while True:
-			buf = src_file.read(256)
-			if len(buf) > 0:
-				dst_file.write(buf)
-			if len(buf) < 256:
-				break
-		src_file.close()
-		dst_file.close()
+		if existing_dirs is None or dstdir not in existing_dirs:
+			if not filesystem.exists(dstdir):
+				if dstdir != "." and dstdir != "":
+					mkdir(dstdir, recursive=True, quiet=quiet)
+			if existing_dirs is not None:
+				existing_dirs.add(dstdir)
+		with open(src, 'rb') as src_file:
+			with open(dst, 'wb') as dst_file:
+				if quiet is False:
+					print_("cp '%s' -> '%s'"%(src,dst))
+				buf = bytearray(COPY_BUFFER_SIZE)
+				part = memoryview(buf)
+				while True:
+					length = src_file.readinto(buf)
+					if not length:
+						break
+					dst_file.write(part[:length])
 	except:
 		print_("Cannot cp '%s' -> '%s'"%(src, dst))
 
@@ -181,15 +177,20 @@ def cp(source, destination, recursive=False, quiet=False):
 
 		_, filenames = filesystem.scandir(path, pattern, recursive)
 
+		existing_dirs = set()
 		for src in filenames:
 			dst = destination + "/" + src[len(path):]
-			copyfile(src,dst,quiet)
+			copyfile(src,dst,quiet,existing_dirs)
 
 def rmfile(filename, quiet=False, force=False, simulate=False):
 	""" Remove file """
+	remove_file(filename, filesystem.normpath(filename), (filesystem.ismicropython() or force) and simulate is False, quiet)
+
+def remove_file(filename, normalized, remove, quiet):
+	""" Remove file with path already normalized, remove indicates if the file must be really removed """
 	try:
-		if (filesystem.ismicropython() or force) and simulate is False:
-			uos.remove(filesystem.normpath(filename))
+		if remove:
+			uos.remove(normalized)
 		if quiet is False:
 			print_("rm '%s'"%(filename))
 	except:
@@ -222,12 +223,13 @@ def rm(file, recursive=False, quiet=False, force=False, simulate=False):
 			dirs, filenames = filesystem.scandir(path, pattern, recursive)
 			directories += dirs
 
+			# The paths given by scandir are already normalized
+			remove = (filesystem.ismicropython() or force) and simulate is False
 			for filename in filenames:
-				rmfile(filename, force=force, quiet=quiet, simulate=simulate)
+				remove_file(filename, filename, remove, quiet)
 
 			if recursive:
-				directories.sort()
-				directories.reverse()
+				directories.sort(reverse=True)
 
 				for directory in directories:
 					rmdir(directory, recursive=recursive, force=force, quiet=quiet, simulate=simulate, ignore_error=True)
@@ -240,38 +242,43 @@ class LsDisplayer:
 		self.count = 1
 		self.long = long
 		self.path = path
+		self.path_bytes = filesystem.normpath(path.encode("utf8")).rstrip(b"/") + b"/"
 		self.showdir = showdir
+		self.print_part = get_print_part()
 
 	def purge_path(self, path):
 		""" Purge the path for the display """
 		path = path.encode("utf8")
+		# Paths under the listed directory are the common case, the prefix is already known
+		if path.startswith(self.path_bytes) and path.find(b"/.") == -1 and path.find(b"//") == -1:
+			return path[len(self.path_bytes):]
 		path = filesystem.normpath(path)
 		prefix = filesystem.prefix([path, self.path.encode("utf8")])
 		return path[len(prefix):].lstrip(b"/")
 
-	def show(self, path):
-		""" Show the information of a file or directory """
-		fileinfo = filesystem.fileinfo(path)
-		date_ = fileinfo[8]
-		size = fileinfo[6]
+	def show(self, path, entry=None):
+		""" Show the information of a file or directory, the entry comes from the directory listing """
+		if entry is None:
+			entry = filesystem.DirEntry(path)
+		if self.long:
+			fileinfo = entry.stat()
+			date_ = fileinfo[8]
+			size = fileinfo[6]
 
 		# If directory
-		if fileinfo[0] & 0x4000 == 0x4000:
+		if entry.is_dir():
 			if self.showdir:
 				if self.long:
 					message = b"%s %s [%s]"%(strings.date_to_bytes(date_),b" "*7,self.purge_path(path))
 				else:
 					message = b"[%s]"%self.purge_path(path)
-				self.count = print_part(message, self.width, self.height, self.count)
+				self.count = self.print_part(message, self.width, self.height, self.count)
 		else:
 			if self.long:
-				fileinfo = filesystem.fileinfo(path)
-				date_ = fileinfo[8]
-				size = fileinfo[6]
 				message = b"%s %s %s"%(strings.date_to_bytes(date_),strings.size_to_bytes(size),self.purge_path(path))
 			else:
 				message = self.purge_path(path)
-			self.count = print_part(message, self.width, self.height, self.count)
+			self.count = self.print_part(message, self.width, self.height, self.count)
 
 	def show_dir(self, state):
 		""" Indicates if the directory must show """
@@ -314,8 +321,9 @@ def searchfile(file, recursive, obj = None):
 def find(file):
 	""" Find a file in directories """
 	filenames = searchfile(file, True)
+	print__ = print_
 	for filename in filenames:
-		print_(filename)
+		print__(filename)
 
 def print_part(message, width, height, count):
 	""" Print a part of text """
@@ -340,33 +348,52 @@ def print_part(message, width, height, count):
 		print_(message)
 	return count
 
+def print_part_redirected(message, width, height, count):
+	""" Print a part of text into the redirected output, without paging """
+	if isinstance(message , bytes):
+		message = message.decode("utf8")
+	stdout_redirected.write(message)
+	stdout_redirected.write("\n")
+	return count
+
+def get_print_part():
+	""" Get the function to print parts of text, chosen once before the loops of print """
+	if stdout_redirected is None:
+		return print_part
+	return print_part_redirected
+
 def grep(file, text, recursive=False, ignorecase=False, regexp=False):
 	""" Grep command """
-	from re import search
 	file = filesystem.normpath(file)
-	def __search(text, content, ignorecase, regexp):
+	# The matcher is chosen once for all lines (micropython re has no ignore case flag)
+	if ignorecase:
+		text = text.lower()
+	if regexp:
+		from re import compile as compile_
+		search = compile_(text).search
 		if ignorecase:
-			content  = content.lower()
-			text = text.lower()
-		if regexp:
-			if search(text, content):
-				return True
+			match = lambda line: search(line.lower()) is not None
 		else:
-			if content.find(text) != -1:
-				return True
-		return False
+			match = lambda line: search(line) is not None
+	elif ignorecase:
+		match = lambda line: line.lower().find(text) != -1
+	else:
+		match = lambda line: line.find(text) != -1
+
+	print_part_ = get_print_part()
 
-	def __grep(text, filename, ignorecase, regexp, width, height, count):
+	def __grep(filename, width, height, count):
 		lineNumber = 1
 		with open(filename,"r", encoding="latin-1") as f:
+			readline = f.readline
 			while 1:
-				line = f.readline()
+				line = readline()
 				if line:
-					if __search(text, line, ignorecase, regexp):
+					if match(line):
 						line = line.replace("\t","    ")
 						message = "%s:%d:%s"%(filename, lineNumber, line)
 						message = message.rstrip()[:width]
-						count = print_part(message, width, height, count)
+						count = print_part_(message, width, height, count)
 						if count is None:
 							print_("")
 							return None
@@ -384,7 +411,7 @@ def grep(file, text, recursive=False, ignorecase=False, regexp=False):
 	height, width = get_screen_size()
 	count = 1
 	for filename in filenames:
-		count = __grep(text, filename, ignorecase, regexp, width, height, count)
+		count = __grep(filename, width, height, count)
 		if count is None:
 			break
 
@@ -434,17 +461,20 @@ def umountsd(mountpoint="/sd"):
 
 def date(update=False, offsetUTC=+1, noDst=False):
 	""" Get or set date """
-	try:
-		from server.timesetting import set_date
-		if update:
+	if update:
+		try:
+			loaded = "server.timesetting" in sys.modules
+			from server.timesetting import set_date
 			if noDst:
 				dst = False
 			else:
 				dst = True
 			set_date(offsetUTC, dst)
-		del sys.modules["server.timesetting"]
-	except:
-		pass
+			# Release the module if it was only loaded for this synchronization
+			if loaded is False:
+				del sys.modules["server.timesetting"]
+		except:
+			pass
 	print_(strings.date_to_string())
 
 def setdate(datetime=""):
@@ -460,17 +490,14 @@ def setdate(datetime=""):
 			for spl in spls:
 				if len(spl) > 0:
 					try:
-						r = spl.lstrip("0")
-						if len(r) == 0:
-							lst.append(0)
-						else:
-							lst.append(eval(r))
+						lst.append(int(spl))
 					except:
 						failed = True
 						break
 			if len(lst) == 6:
 				# pylint: disable=unbalanced-tuple-unpacking
 				year,month,day,hour,minute,second = lst
+				import machine
 				machine.RTC().datetime((year, month, day, 0, hour, minute, second, 0))
 			else:
 				failed = True
@@ -504,10 +531,13 @@ def reboot():
 		from tools import system
 		system.reboot("Reboot device with command")
 	except:
+		import machine
 		machine.deepsleep(1000)
 
 def deepsleep(seconds=60):
 	""" Deep sleep command """
+	import machine
+	logger.log_close()
 	machine.deepsleep(int(seconds)*1000)
 
 edit_class = None
@@ -530,12 +560,14 @@ def cat(file):
 		f = open(file, "r")
 		height, width = get_screen_size()
 		count = 1
+		print_part_ = get_print_part()
+		readline = f.readline
 		while 1:
-			line = f.readline()
+			line = readline()
 			if not line:
 				break
 			message = line.replace("\t","    ").rstrip()[:width]
-			count = print_part(message, width, height, count)
+			count = print_part_(message, width, height, count)
 			if count is None:
 				break
 		f.close()
@@ -562,7 +594,7 @@ def man(command):
 def man_one(command_name):
 	""" Manual of one command """
 	try:
-		command_name, command_function, command_params, command_flags = get_command(command_name)
+		command_name, command_function, command_params, command_flags, _, _ = get_command(command_name)
 		text = "  " + command_name + " "
 		for param in command_params:
 			text += param + " "
@@ -581,11 +613,12 @@ def help():
 	count = 1
 	cmds = list(shell_commands.keys())
 	cmds.sort()
+	print_part_ = get_print_part()
 	for command in cmds:
 		lines = man_one(command)
 		lines = "-"*30+"\n" + lines
 		for line in lines.split("\n"):
-			count = print_part(line, width, height, count)
+			count = print_part_(line, width, height, count)
 			if count is None:
 				return
 
@@ -611,38 +644,64 @@ def dump_(filename):
 	else:
 		width = 16
 	offset = 0
-	file = open(filename, "rb")
-	data = b' '
 	count = 1
-	while True:
-		line = io.BytesIO()
-		line.write(b'%08X  ' % offset)
-		data = file.read(width)
-		if len(data) <= 0:
-			break
-		strings.dump_line (data, line, width)
-		offset += width
-		count = print_part(line.getvalue(), width, height, count)
-		if count is None:
-			break
+	# Line : offset, 2 spaces, hexadecimal values separated by space, space, |, ascii, |
+	ascii_start = 10 + 3*width + 1
+	line = bytearray(b" "*(ascii_start + width + 1))
+	line[ascii_start-1] = 0x7C
+	line[-1] = 0x7C
+	print_part_ = get_print_part()
+	hexadecimal = strings.HEXADECIMAL
+	with open(filename, "rb") as file:
+		read = file.read
+		while True:
+			data = read(width)
+			size = len(data)
+			if size <= 0:
+				break
+			for i in range(8):
+				line[7-i] = hexadecimal[(offset >> (i << 2)) & 0xF]
+			pos = 10
+			for i in range(size):
+				byte = data[i]
+				line[pos]   = hexadecimal[byte >> 4]
+				line[pos+1] = hexadecimal[byte & 0xF]
+				if byte < 0x20 or byte >= 0x7F:
+					byte = 0x2E
+				line[ascii_start + i] = byte
+				pos += 3
+			# Last line shorter
+			for i in range(size, width):
+				line[pos]   = 0x20
+				line[pos+1] = 0x20
+				line[ascii_start + i] = 0x20
+				pos += 3
+			offset += width
+			count = print_part_(bytes(line), width, height, count)
+			if count is None:
+				break
 
 def cls():
 	""" clear screen """
-	print_("\x1B[2J\x1B[0;0f", end="")
+	global cam_flasher_detected
+	cam_flasher_detected = None
+	print_(CLEAR_SCREEN, end="")
 
+cam_flasher_detected = None
 def check_cam_flasher():
-	""" Check if the terminal is CamFlasher """
-	global stdout_redirected
+	""" Check if the terminal is CamFlasher, the terminal is only probed once per shell session """
+	global stdout_redirected, cam_flasher_detected
 	if stdout_redirected is None:
-		# Request terminal device attribut
-		sys.stdout.write(b"\x1B[0c")
+		if cam_flasher_detected is None:
+			# Request terminal device attribut
+			sys.stdout.write(b"\x1B[0c")
 
-		# Wait terminal device attribut response
-		response = terminal.getch(duration=1000)
+			# Wait terminal device attribut response
+			response = terminal.getch(duration=1000)
 
-		# If CamFlasher detected
-		if response == "\x1B[?3;2c":
-			return True
+			# If CamFlasher detected
+			cam_flasher_detected = response == "\x1B[?3;2c"
+		return cam_flasher_detected
 	return False
 
 def upload(file="", recursive=False):
@@ -669,13 +728,14 @@ class Exporter:
 	def __init__(self):
 		""" Constructor """
 
-	def send_file(self, path):
+	def send_file(self, path, entry=None):
 		""" Send the file """
 		result = True
-		fileinfo = filesystem.fileinfo(path)
+		if entry is None:
+			entry = filesystem.DirEntry(path)
 
 		# If a file
-		if fileinfo[0] & 0x4000 != 0x4000:
+		if not entry.is_dir():
 			file_write = exchange.FileWriter()
 			if filesystem.exists(path):
 				sys.stdout.buffer.write("࿊".encode("utf8"))
@@ -683,11 +743,11 @@ class Exporter:
 				watchdog.WatchDog.feed()
 		return result
 
-	def show(self, path):
+	def show(self, path, entry=None):
 		""" Show the information of a file or directory """
 		for _ in range(3):
 			# If the send successful exit, else retry three time
-			if self.send_file(path) is True:
+			if self.send_file(path, entry) is True:
 				break
 
 	def show_dir(self, state):
@@ -723,59 +783,59 @@ def sysinfo():
 	""" Get system informations """
 	print_(strings.tostrings(info.sysinfo(display=False)))
 
-def vtcolors():
-	""" Show all VT100 colors """
-	res = b'\x1B[4m4 bits colors\x1B[m\n'
+vtcolors_text = None
+def get_vtcolors():
+	""" Get the text showing all VT100 colors, it is built only once """
+	global vtcolors_text
+	if vtcolors_text is not None:
+		return vtcolors_text
+	res = [b'\x1B[4m4 bits colors\x1B[m\n']
 	for i in range(16):
 		if i % 8 == 0:
-			res += b"\n  "
+			res.append(b"\n  ")
 		if i < 9:
 			forecolor = 15
 		else:
 			forecolor = 0
-		res += b"\x1B[38;5;%dm\x1B[48;5;%dm %2d \x1B[0m"%(forecolor, i,i)
-	res += b'\n\n\x1B[4m8 bits colors\x1B[m\n'
+		res.append(b"\x1B[38;5;%dm\x1B[48;5;%dm %2d \x1B[0m"%(forecolor, i,i))
+	res.append(b'\n\n\x1B[4m8 bits colors\x1B[m\n')
 	j = 0
 	for i in range(16,256):
 		if j % 12== 0:
-			res += b"\n  "
+			res.append(b"\n  ")
 		backcolor = i
 		if j % 36 < 36//2:
 			forecolor = 15
 		else:
 			forecolor = 0
-		res += b"\x1B[38;5;%dm\x1B[48;5;%dm %3d \x1B[0m"%(forecolor,backcolor,i)
+		res.append(b"\x1B[38;5;%dm\x1B[48;5;%dm %3d \x1B[0m"%(forecolor,backcolor,i))
 		j += 1
-	res += b'\n\n\x1B[4mModifiers\x1B[m\n\n'
+	res.append(b'\n\n\x1B[4mModifiers\x1B[m\n\n')
+
+	for i,j in [(0,b"reset/normal"),(1,b"bold"),(3,b"italic"),(4,b"underline"),(7,b"reverse")]:
+		res.append(b"  %d : \x1B[%dm%s\x1B[0m\n"%(i,i,j))
+	res.append(b'\n\x1B[4mExamples\x1B[m\n\n')
+	res.append(b'  >>> print("\\033[\033[1m1\033[m;\033[7m7\033[mmBold reverse\\033[0m")\n')
+	res.append(b"  \033[1;7mBold reverse\033[0m")
+	res.append(b"\n\n")
+	res.append(b'  >>> print("\033[38;5;15m\033[48;5;1m\\033[48;5;1m\033[m\033[38;5;13m\\033[38;5;13m\033[mHello\\033[m")\n')
+	res.append(b"  \033[48;5;1m\033[38;5;13mHello\033[m\n")
 
-	for i,j in [(0,"reset/normal"),(1,b"bold"),(3,b"italic"),(4,b"underline"),(7,b"reverse")]:
-		res += b"  %d : \x1B[%dm%s\x1B[0m\n"%(i,i,j)
-	res += b'\n\x1B[4mExamples\x1B[m\n\n'
-	res += b'  >>> print("\\033[\033[1m1\033[m;\033[7m7\033[mmBold reverse\\033[0m")\n'
-	res += b"  \033[1;7mBold reverse\033[0m"
-	res += b"\n\n"
-	res += b'  >>> print("\033[38;5;15m\033[48;5;1m\\033[48;5;1m\033[m\033[38;5;13m\\033[38;5;13m\033[mHello\\033[m")\n'
-	res += b"  \033[48;5;1m\033[38;5;13mHello\033[m\n"
+	vtcolors_text = b"".join(res).decode("utf8")
+	return vtcolors_text
 
-	print_(res.decode("utf8"))
+def vtcolors():
+	""" Show all VT100 colors """
+	print_(get_vtcolors())
 
 def get_command(command_name):
 	""" Get a command callback according to the command name """
 	try:
-		global shell_commands
-		command = shell_commands[command_name]
-		command_function = command[0]
-		command_params = []
-		command_flags  = []
-		for item in command[1:]:
-			if type(item) == type(""):
-				command_params.append(item)
-			if type(item) == type((0,)):
-				command_flags.append(item)
+		command_function, command_params, command_flags, short_flags, long_flags = commands_index[command_name]
 	except  Exception as err:
 		# pylint: disable=raise-missing-from
 		raise Exception("Command not found '%s'"%command_name)
-	return command_name, command_function, command_params, command_flags
+	return command_name, command_function, command_params, command_flags, short_flags, long_flags
 
 def exec_command(args):
 	""" Execute command """
@@ -783,7 +843,8 @@ def exec_command(args):
 	command_name = ""
 	command_function = None
 	command_params = []
-	command_flags = []
+	short_flags = {}
+	long_flags = {}
 	output_redirection = None
 	output_filename = None
 	try:
@@ -794,22 +855,18 @@ def exec_command(args):
 				arg = arg.strip()
 				if len(arg) > 0:
 					if command_name == "":
-						command_name, command_function, command_params, command_flags = get_command(arg)
+						command_name, command_function, command_params, _, short_flags, long_flags = get_command(arg)
 					else:
 						if len(arg) >= 2 and arg[:2] == "--":
-							for commandFlag in command_flags:
-								if arg.strip()[2:] == commandFlag[1].strip():
-									flags[commandFlag[1]] = commandFlag[2]
-									break
-							else:
+							command_flag = long_flags.get(arg[2:])
+							if command_flag is None:
 								raise Exception("Illegal option '%s' for"%arg)
+							flags[command_flag[1]] = command_flag[2]
 						elif arg[0] == "-":
-							for commandFlag in command_flags:
-								if arg.strip() == commandFlag[0].strip():
-									flags[commandFlag[1]] = commandFlag[2]
-									break
-							else:
+							command_flag = short_flags.get(arg)
+							if command_flag is None:
 								raise Exception("Illegal option '%s' for"%arg)
+							flags[command_flag[1]] = command_flag[2]
 						elif arg[0] == ">":
 							output_redirection = True
 						else:
@@ -848,56 +905,74 @@ def exec_command(args):
 			stdout_redirected.close()
 		stdout_redirected = None
 
-def parse_command_line(commandLine):
-	""" Parse command line """
+def split_command_line(commandLine):
+	""" Split the command line into commands, each command is a list of arguments """
 	commands = []
 	args = []
-	quote = None
 	arg = ""
-	for char in commandLine:
-		if char == '"' or char == "'":
-			if quote is not None:
-				if quote == char:
-					args.append(arg)
-					arg = ""
-					quote = None
-				else:
-					arg += char
-			else:
-				quote = char
-		elif char == " ":
-			if quote is not None:
-				arg += char
-			else:
-				args.append(arg)
-				arg = ""
+	pos = 0
+	length = len(commandLine)
+	while pos < length:
+		# Search the next separator or quote, the characters before are kept as is
+		end = length
+		for separator in ' ;"\'':
+			found = commandLine.find(separator, pos, end)
+			if found != -1:
+				end = found
+		arg += commandLine[pos:end]
+		if end == length:
+			break
+		char = commandLine[end]
+		if char == " ":
+			args.append(arg)
+			arg = ""
 		elif char == ";":
-			if quote is not None:
-				arg += char
-			else:
-				if len(arg) > 0:
-					args.append(arg)
-				commands.append(args)
-				arg = ""
-				args = []
+			if len(arg) > 0:
+				args.append(arg)
+			commands.append(args)
+			arg = ""
+			args = []
 		else:
-			arg += char
+			closing = commandLine.find(char, end + 1)
+			if closing == -1:
+				arg += commandLine[end + 1:]
+				break
+			args.append(arg + commandLine[end + 1:closing])
+			arg = ""
+			end = closing
+		pos = end + 1
 	if len(arg) > 0:
 		args.append(arg)
 	if len(args) > 0:
 		commands.append(args)
+	return commands
 
-	for command in commands:
+def parse_command_line(commandLine):
+	""" Parse command line, it can also be a list of commands already split """
+	if isinstance(commandLine, str):
+		commandLine = split_command_line(commandLine)
+	for command in commandLine:
 		exec_command(command)
+		if shell_exited:
+			break
 
-def sh(path=None, throw=False):
-	""" Start the shell """
-	global shell_exited
+def sh(path=None, throw=False, script=None):
+	""" Start the shell, or execute all commands of the script file without prompt """
+	global shell_exited, cam_flasher_detected
+	cam_flasher_detected = None
 
 	if path is not None:
 		uos.chdir(path)
 
 	shell_exited = False
+	if script is not None:
+		commands = []
+		with open(script, "r") as file:
+			for line in file:
+				commands += split_command_line(line.rstrip("\r\n"))
+		parse_command_line(commands)
+		return
+
 	while shell_exited is False:
 		try:
 			commandLine = ""
@@ -926,10 +1001,10 @@ async def async_shell():
 
 	print_("\nPress key to start shell")
 	if filesystem.ismicropython():
-		polling1 = 2
+		polling1_ms = 2000
 		polling2 = 0.01
 	else:
-		polling1 = 0.1
+		polling1_ms = 100
 		polling2 = 0.5
 	while 1:
 		# If key pressed
@@ -969,7 +1044,7 @@ async def async_shell():
 				if Server is not None:
 					Server.resume()
 		else:
-			await uasyncio.sleep(polling1)
+			await uasyncio.sleep_ms(polling1_ms)
 
 shell_commands = \
 {
@@ -1016,5 +1091,28 @@ shell_commands = \
 	"vtcolors"   :[vtcolors                                ],
 }
 
+def index_commands(commands):
+	""" Separate the parameters and the flags of commands, flags are indexed by short and long name """
+	result = {}
+	for command_name, command in commands.items():
+		command_params = []
+		command_flags  = []
+		short_flags = {}
+		long_flags  = {}
+		for item in command[1:]:
+			if type(item) == type(""):
+				command_params.append(item)
+			if type(item) == type((0,)):
+				command_flags.append(item)
+				short_flags[item[0]] = item
+				long_flags[item[1]] = item
+		result[command_name] = (command[0], command_params, command_flags, short_flags, long_flags)
+	return result
+
+commands_index = index_commands(shell_commands)
+
 if __name__ == "__main__":
-	sh(sys.argv[1])
+	if len(sys.argv) > 2:
+		sh(sys.argv[1], script=sys.argv[2])
+	else:
+		sh(sys.argv[1])
@@ -35,3 +35,15 @@ def gethash(password):
 	hash_ = hashlib.sha256()
 	hash_.update(password)
 	return hexlify(hash_.digest())
+
+try:
+	from hmac import compare_digest
+except:
+	def compare_digest(a, b):
+		""" Compare two hashes in constant time, to avoid timing attacks """
+		if len(a) != len(b):
+			return False
+		result = 0
+		for x, y in zip(a, b):
+			result |= x ^ y
+		return result == 0
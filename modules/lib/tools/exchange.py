@@ -454,21 +454,23 @@ class FileWriter:
 					# Open file
 					with open(filename, "rb") as file:
 						chunk = bytearray(CHUNK_SIZE)
+						chunk_view = memoryview(chunk)
 						while size > 0:
 							if printer is not None:
 								chunk_id += 1
 								printer("\r %-40s %s"%(filename_, ["|","\\","-","/"][chunk_id%4]), end="")
 							# Read file part
 							length = file.readinto(chunk)
+							part = chunk_view[:length]
 
 							# Encode in base64 and send chunk
-							out_file.write(binascii.b2a_base64(chunk[:length]).rstrip())
+							out_file.write(binascii.b2a_base64(part).rstrip())
 
 							# Compute the remaining size
 							size -= length
 
 							# Compte crc
-							crc = binascii.crc32(chunk[:length], crc)
+							crc = binascii.crc32(part, crc)
 
 							# Wait reception ack
 							wait_ack(in_file)
@@ -172,6 +172,53 @@ def ismicropython():
 		return True
 	return False
 
+class DirEntry:
+	""" Entry of a directory listing, the type comes from the listing and the stat is only done once on demand """
+	def __init__(self, path, name=None, typ=None, entry=None):
+		""" Constructor """
+		self.path  = path
+		self.name  = name
+		self.entry = entry
+		self.info  = None
+		if typ is None:
+			typ = self.stat()[0]
+		self.typ   = typ
+
+	def is_dir(self):
+		""" Indicates if the entry is a directory """
+		return self.typ & 0x4000 == 0x4000
+
+	def stat(self):
+		""" Get the file informations """
+		if self.info is None:
+			if self.entry is not None:
+				self.info = self.entry.stat()
+			else:
+				self.info = os.stat(self.path)
+		return self.info
+
+def ilistdir(path):
+	""" List the directory, yields a DirEntry for each file or directory.
+	The type is given by the directory listing itself, without stat of each entry """
+	if ismicropython():
+		for item in os.ilistdir(path):
+			yield DirEntry(join_path(path, item[0]), item[0], item[1])
+	else:
+		with os.scandir(path) as entries:
+			for entry in entries:
+				yield DirEntry(join_path(path, entry.name), entry.name, 0x4000 if entry.is_dir() else 0x8000, entry)
+
+def join_path(path, name):
+	""" Join the directory path and the name of file """
+	if path != "":
+		filename = path + "/" + name
+	else:
+		filename = name
+	if sys.platform != "win32":
+		filename = filename.replace("//","/")
+		filename = filename.replace("//","/")
+	return filename
+
 def scandir(path, pattern, recursive, displayer=None):
 	""" Scan recursively a directory """
 	filenames   = []
@@ -179,30 +226,23 @@ def scandir(path, pattern, recursive, displayer=None):
 	if path == "":
 		path = "."
 	if path is not None and pattern is not None:
-		for file in os.listdir(path):
-			if path != "":
-				filename = path + "/" + file
-			else:
-				filename = file
-			if sys.platform != "win32":
-				filename = filename.replace("//","/")
-				filename = filename.replace("//","/")
-			if isdir(filename):
+		for entry in ilistdir(path):
+			if entry.is_dir():
 				if displayer:
-					displayer.show(filename)
+					displayer.show(entry.path, entry)
 				else:
-					directories.append(filename)
+					directories.append(entry.path)
 				if recursive:
-					dirs,fils = scandir(filename, pattern, recursive, displayer)
+					dirs,fils = scandir(entry.path, pattern, recursive, displayer)
 					filenames += fils
 					directories += dirs
 			else:
-				if fnmatch.fnmatch(file, pattern):
+				if fnmatch.fnmatch(entry.name, pattern):
 					if displayer:
-						displayer.show(filename)
+						displayer.show(entry.path, entry)
 						filenames = [""]
 					else:
-						filenames.append(filename)
+						filenames.append(entry.path)
 	return directories, filenames
 
 def prefix(files):
@@ -3,74 +3,157 @@
 """ Logger and exception functions """
 import sys
 import io
+import time
 try:
 	from tools import filesystem, strings
 except:
 	import filesystem
 	import strings
+format_exc = None
+if not filesystem.ismicropython():
+	from traceback import format_exc
 
+class ExceptionStream(io.IOBase):
+	""" Stream that collects the text of exception into a buffer reused between calls """
+	def __init__(self):
+		""" Constructor """
+		self.buffer = bytearray()
+
+	def write(self, data):
+		""" Append data to the buffer """
+		self.buffer.extend(strings.tobytes(data))
+		return len(data)
+
+	def getvalue(self):
+		""" Get the text collected and empty the buffer """
+		result = str(self.buffer, "utf8")
+		del self.buffer[:]
+		return result
+
+exception_stream = None
 
 def exception(err, msg=""):
 	""" Return the content of exception into a string """
-	file = io.StringIO()
-	if filesystem.ismicropython():
+	global exception_stream
+	if format_exc is None:
+		if exception_stream is None:
+			exception_stream = ExceptionStream()
 		# pylint: disable=no-member
-		sys.print_exception(err, file)
-		text = file.getvalue()
-	else:
-		try:
-			import traceback
-			file.write(traceback.format_exc())
-		except Exception as err:
-			print(err)
-		text = file.getvalue()
-	return text
+		sys.print_exception(err, exception_stream)
+		return exception_stream.getvalue()
+	return format_exc()
 
 def syslog(err, msg="", display=True):
 	""" Log the error in syslog.log file """
 	if isinstance(err, Exception):
 		err = exception(err)
-	if msg != "":
-		msg += "\n"
-		if display:
-			print(strings.tostrings(msg))
+	else:
+		err = strings.tostrings(err)
+	if msg:
+		err = strings.tostrings(msg) + "\n" + err
 	if display:
-		print(strings.tostrings(err))
+		print(err)
 
-	result = "%s%s"%(strings.tostrings(msg),strings.tostrings(err))
+	log(err, flush=True)
+	return err
 
-	log(result)
-	return result
+LOG_MAX_SIZE  = 32*1024
+LOG_FLUSH_COUNT = 8
+log_file  = None
+log_size  = 0
+log_count = 0
+log_second = -1
+log_date   = b""
+log_milliseconds = bytearray(b".000 ")
 
-def log(msg):
-	""" Log message in syslog.log file without printing """
-	try:
-		filename = "syslog.log"
-		if filesystem.ismicropython():
-			filename = "/" + filename
+def log_timestamp():
+	""" Get the date of the log line, the date until the seconds is formatted only when the second changes """
+	global log_second, log_date
+	milliseconds = time.time_ns() // 1000000
+	second = milliseconds // 1000
+	if second != log_second:
+		log_second = second
+		log_date = b"%04d/%02d/%02d %02d:%02d:%02d"%strings.local_time(second)[:6]
+	milliseconds %= 1000
+	log_milliseconds[1] = 0x30 + milliseconds // 100
+	log_milliseconds[2] = 0x30 + (milliseconds // 10) % 10
+	log_milliseconds[3] = 0x30 + milliseconds % 10
+	return log_date, log_milliseconds
+
+def log_filename():
+	""" Get the name of syslog file """
+	if filesystem.ismicropython():
+		return "/syslog.log"
+	return "syslog.log"
 
-		log_file = open(filename,"a")
-		log_file.seek(0,2)
+def log_open(filename):
+	""" Open the syslog file in append mode and get its current size """
+	global log_file, log_size, log_count
+	log_file  = open(filename,"ab")
+	log_size  = filesystem.filesize(filename)
+	log_count = 0
 
-		if log_file.tell() >32*1024:
+def log_close():
+	""" Flush and close the syslog file """
+	global log_file
+	if log_file is not None:
+		try:
 			log_file.close()
+		finally:
+			log_file = None
+
+def log(msg, flush=False):
+	""" Log message in syslog.log file without printing, the routine lines are flushed by group, the errors at once """
+	global log_size, log_count
+	try:
+		filename = log_filename()
+		if log_file is None:
+			log_open(filename)
+
+		if log_size > LOG_MAX_SIZE:
+			log_close()
 			filesystem.rename(filename + ".3",filename + ".4")
 			filesystem.rename(filename + ".2",filename + ".3")
 			filesystem.rename(filename + ".1",filename + ".2")
 			filesystem.rename(filename       ,filename + ".1")
-			log_file = open(filename,"a")
+			log_open(filename)
 
-		log_file.write(strings.date_ms_to_string() + " %s\n"%(msg))
-		log_file.flush()
-		log_file.close()
+		msg = strings.tobytes(msg)
+		write = log_file.write
+		date, milliseconds = log_timestamp()
+		write(date)
+		write(milliseconds)
+		write(msg)
+		write(b"\n")
+		# Date (23 bytes), space and line feed
+		log_size  += len(msg) + 25
+		log_count += 1
+		if flush or log_count >= LOG_FLUSH_COUNT:
+			log_file.flush()
+			log_count = 0
 	except:
+		log_close()
 		print("No space")
 
 
 def html_exception(err):
 	""" Return the content of exception into an html bytes """
-	text = exception(err)
-	text = text.replace("\n    ","<br>&nbsp;&nbsp;&nbsp;&nbsp;")
-	text = text.replace("\n  ","<br>&nbsp;&nbsp;")
-	text = text.replace("\n","<br>")
-	return strings.tobytes(text)
+	text = strings.tobytes(exception(err))
+	result = bytearray()
+	length = len(text)
+	pos = 0
+	while pos < length:
+		end = text.find(b"\n", pos)
+		if end == -1:
+			result.extend(text[pos:])
+			break
+		result.extend(text[pos:end])
+		result.extend(b"<br>")
+		pos = end + 1
+		if text.startswith(b"    ", pos):
+			result.extend(b"&nbsp;&nbsp;&nbsp;&nbsp;")
+			pos += 4
+		elif text.startswith(b"  ", pos):
+			result.extend(b"&nbsp;&nbsp;")
+			pos += 2
+	return bytes(result)
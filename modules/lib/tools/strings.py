@@ -4,6 +4,8 @@
 import binascii
 import time
 
+HEXADECIMAL = b"0123456789ABCDEF"
+
 def local_time(date=None):
 	""" Safe local time, it return 2000/1/1 00:00:00 if date can be extracted """
 	try:
@@ -244,11 +246,11 @@ def dump_line (data, line = None, width = 0):
 	# Display of ASCII codes
 	line.write(b' |')
 
-	for i in data:
-		if i >= 0x20 and  i < 0x7F:
-			line.write(i.to_bytes(1,"big"))
-		else:
-			line.write(b'.')
+	printable = bytearray(data)
+	for i in range(size):
+		if printable[i] < 0x20 or printable[i] >= 0x7F:
+			printable[i] = 0x2E
+	line.write(printable)
 
 	# Filling of vacuum according to the size of the dump
 	line.write(b' '*fill)
@@ -18,6 +18,7 @@ def reboot(message="Reboot"):
 			camera.deinit()
 	except:
 		pass
+	logger.log_close()
 	try:
 		import machine
 		machine.deepsleep(1000)
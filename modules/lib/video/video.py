@@ -6,11 +6,56 @@ I added in the firmware the possibility of detecting movements,
 as well as a lot of adjustment on the camera, not available on the other firmware that manages the esp32cam.
 """
 # pylint: disable=multiple-statements
+import gc
 import time
 import uasyncio
 from tools import info,system,jsonconfig,logger
+STAT_CAMERA = 20000
+RETRY_MESSAGES = tuple("Failed to get image %d retry before reset"%retry for retry in range(4))
+
+# Named frame sizes and pixel formats, passing them avoids creating new bytes in callers
+UXGA  = b"UXGA"
+SXGA  = b"SXGA"
+XGA   = b"XGA"
+SVGA  = b"SVGA"
+VGA   = b"VGA"
+CIF   = b"CIF"
+QVGA  = b"QVGA"
+HQVGA = b"HQVGA"
+QQVGA = b"QQVGA"
+
+RGB565    = b"RGB565"
+YUV422    = b"YUV422"
+GRAYSCALE = b"GRAYSCALE"
+JPEG      = b"JPEG"
+RGB888    = b"RGB888"
+RAW       = b"RAW"
+RGB444    = b"RGB444"
+RGB555    = b"RGB555"
+
+FRAMESIZES = {}
+PIXFORMATS = {}
 if info.iscamera():
 	import camera
+	FRAMESIZES = {
+		UXGA :camera.FRAMESIZE_UXGA,  b"1600x1200":camera.FRAMESIZE_UXGA,
+		SXGA :camera.FRAMESIZE_SXGA,  b"1280x1024":camera.FRAMESIZE_SXGA,
+		XGA  :camera.FRAMESIZE_XGA,   b"1024x768" :camera.FRAMESIZE_XGA,
+		SVGA :camera.FRAMESIZE_SVGA,  b"800x600"  :camera.FRAMESIZE_SVGA,
+		VGA  :camera.FRAMESIZE_VGA,   b"640x480"  :camera.FRAMESIZE_VGA,
+		CIF  :camera.FRAMESIZE_CIF,   b"400x296"  :camera.FRAMESIZE_CIF,
+		QVGA :camera.FRAMESIZE_QVGA,  b"320x240"  :camera.FRAMESIZE_QVGA,
+		HQVGA:camera.FRAMESIZE_HQVGA, b"240x176"  :camera.FRAMESIZE_HQVGA,
+		QQVGA:camera.FRAMESIZE_QQVGA, b"160x120"  :camera.FRAMESIZE_QQVGA}
+	PIXFORMATS = {
+		RGB565   :camera.PIXFORMAT_RGB565,
+		YUV422   :camera.PIXFORMAT_YUV422,
+		GRAYSCALE:camera.PIXFORMAT_GRAYSCALE,
+		JPEG     :camera.PIXFORMAT_JPEG,
+		RGB888   :camera.PIXFORMAT_RGB888,
+		RAW      :camera.PIXFORMAT_RAW,
+		RGB444   :camera.PIXFORMAT_RGB444,
+		RGB555   :camera.PIXFORMAT_RGB555}
 
 class CameraConfig(jsonconfig.JsonConfig):
 	""" Class that collects the camera rendering configuration """
@@ -19,7 +64,7 @@ class CameraConfig(jsonconfig.JsonConfig):
 		jsonconfig.JsonConfig.__init__(self)
 		self.activated  = True
 		self.framesize  = b"640x480"
-		self.pixformat  = b"JPEG"
+		self.pixformat  = JPEG
 		self.quality    = 25
 		self.brightness = 0
 		self.contrast   = 0
@@ -34,7 +79,6 @@ class Reservation:
 		""" Constructor """
 		self.identifier = None
 		self.count = 0
-		self.lock = uasyncio.Lock()
 		self.suspended = 0
 
 	async def reserve(self, object_, timeout=0, suspension=None):
@@ -42,7 +86,7 @@ class Reservation:
 		result = False
 		# Wait
 		while True:
-			result = await self.acquire(object_, suspension)
+			result = self.acquire(object_, suspension)
 			if result:
 				break
 			timeout -= 1
@@ -51,58 +95,51 @@ class Reservation:
 			await uasyncio.sleep_ms(1000)
 		return result
 
-	async def acquire(self, object_, suspension=None):
+	def acquire(self, object_, suspension=None):
 		""" Reserve the camera, is used to stream the output of the camera
-		to the web page. It stop the motion detection during this phase """
+		to the web page. It stop the motion detection during this phase.
+		It does not await, so it cannot be interrupted by another task and needs no lock """
 		result = False
-		await self.lock.acquire()
 		identifier = id(object_)
-		try:
-			# If not reserved
-			if self.identifier is None:
-				# If suspension not required
-				if suspension is None:
-					# If previous suspension ended
-					if self.suspended <= 0:
-						# Reserve
-						self.identifier = identifier
-						self.count = 1
-						self.suspended = 0
-						result = True
-					else:
-						# Decrease suspension counter
-						self.suspended -= 1
-				else:
+		# If not reserved
+		if self.identifier is None:
+			# If suspension not required
+			if suspension is None:
+				# If previous suspension ended
+				if self.suspended <= 0:
 					# Reserve
 					self.identifier = identifier
 					self.count = 1
-					self.suspended = suspension
+					self.suspended = 0
 					result = True
-			# If already reserved by the current object_
-			elif self.identifier == identifier:
-				# Increase reservation counter
-				self.count += 1
+				else:
+					# Decrease suspension counter
+					self.suspended -= 1
+			else:
+				# Reserve
+				self.identifier = identifier
+				self.count = 1
 				self.suspended = suspension
 				result = True
-		finally:
-			self.lock.release()
+		# If already reserved by the current object_
+		elif self.identifier == identifier:
+			# Increase reservation counter
+			self.count += 1
+			self.suspended = suspension
+			result = True
 		return result
 
-	async def unreserve(self, object_):
+	def unreserve(self, object_):
 		""" Unreserve the camera """
 		result = False
-		await self.lock.acquire()
 		identifier = id(object_)
-		try:
-			if self.identifier == identifier:
-				if self.count <= 1:
-					self.count = 0
-					self.identifier = None
-				else:
-					self.count -= 1
-				result = True
-		finally:
-			self.lock.release()
+		if self.identifier == identifier:
+			if self.count <= 1:
+				self.count = 0
+				self.identifier = None
+			else:
+				self.count -= 1
+			result = True
 		return result
 
 class Camera:
@@ -110,10 +147,10 @@ class Camera:
 	reservation = Reservation()
 	opened = False
 	lock = uasyncio.Lock()
-	modified = [False]
-	success = [0]
-	failed  = [0]
-	newFailed = [0]
+	modified = False
+	success = 0
+	failed  = 0
+	newFailed = 0
 	config = None
 
 	@staticmethod
@@ -197,18 +234,20 @@ class Camera:
 				flash_led    = flash_led)
 
 	@staticmethod
-	def open():
+	async def open():
 		""" Open the camera """
 		Camera.get_config()
 		if Camera.is_activated():
 			result = True
 			if Camera.opened is False:
-				for i in range(10):
+				delay = 50
+				for i in range(8):
 					res = camera.init()
 					if res is False:
 						# print("Camera not initialized")
 						camera.deinit()
-						time.sleep(0.5)
+						await uasyncio.sleep_ms(delay)
+						delay = min(delay*2, 400)
 					else:
 						break
 				else:
@@ -224,14 +263,14 @@ class Camera:
 	@staticmethod
 	def get_stat():
 		""" Statistic """
-		return Camera.success[0], Camera.failed[0]
+		return Camera.success, Camera.failed
 
 	@staticmethod
 	def reset_stat():
 		""" Reset statistic """
-		Camera.success[0] = 0
-		Camera.failed [0] = 0
-		Camera.newFailed[0] = 0
+		Camera.success = 0
+		Camera.failed = 0
+		Camera.newFailed = 0
 
 	@staticmethod
 	def close():
@@ -272,26 +311,28 @@ class Camera:
 					system.reboot("Reboot forced after camera problem")
 				try:
 					result = callback()
-					Camera.success[0] += 1
+					Camera.success += 1
 					break
 				except ValueError:
-					Camera.failed[0] += 1
-					Camera.newFailed[0] += 1
+					Camera.failed += 1
+					Camera.newFailed += 1
+					# On first failure, free the memory fragments before retrying
+					if retry == 10:
+						gc.collect()
 					if retry <= 3:
-						logger.syslog("Failed to get image %d retry before reset"%retry)
+						logger.syslog(RETRY_MESSAGES[retry])
 					retry -= 1
 					time.sleep(0.5)
-			total = Camera.success[0] + Camera.failed[0]
-			STAT_CAMERA=20000
+			total = Camera.success + Camera.failed
 			if (total % STAT_CAMERA) == 0:
-				if Camera.success[0] != 0:
-					newFailed = 100.-((Camera.newFailed[0]*100)/STAT_CAMERA)
-					failed    = 100.-((Camera.failed[0]*100)/total)
+				if Camera.success != 0:
+					newFailed = 100.-((Camera.newFailed*100)/STAT_CAMERA)
+					failed    = 100.-((Camera.failed*100)/total)
 				else:
 					newFailed = 0.
 					failed    = 0.
 				logger.syslog("Camera stat : last %-3.1f%%, total %-3.1f%% success on %d"%(newFailed, failed, total))
-				Camera.newFailed[0] = 0
+				Camera.newFailed = 0
 		return result
 
 	@staticmethod
@@ -303,32 +344,23 @@ class Camera:
 	@staticmethod
 	async def unreserve(object_):
 		""" Unreserve the camera """
-		return await Camera.reservation.unreserve(object_)
+		return Camera.reservation.unreserve(object_)
 
 	@staticmethod
 	def is_modified():
 		""" Indicates that the camera configuration has been changed """
-		return Camera.modified[0]
+		return Camera.modified
 
 	@staticmethod
 	def clear_modified():
 		""" Reset the indicator of configuration modification """
-		Camera.modified[0] = False
+		Camera.modified = False
 
 	@staticmethod
 	def framesize(resolution):
 		""" Configure the frame size """
-		val = None
-		Camera.modified[0] = True
-		if resolution == b"UXGA"  or resolution == b"1600x1200" :val = camera.FRAMESIZE_UXGA
-		if resolution == b"SXGA"  or resolution == b"1280x1024" :val = camera.FRAMESIZE_SXGA
-		if resolution == b"XGA"   or resolution == b"1024x768"  :val = camera.FRAMESIZE_XGA
-		if resolution == b"SVGA"  or resolution == b"800x600"   :val = camera.FRAMESIZE_SVGA
-		if resolution == b"VGA"   or resolution == b"640x480"   :val = camera.FRAMESIZE_VGA
-		if resolution == b"CIF"   or resolution == b"400x296"   :val = camera.FRAMESIZE_CIF
-		if resolution == b"QVGA"  or resolution == b"320x240"   :val = camera.FRAMESIZE_QVGA
-		if resolution == b"HQVGA" or resolution == b"240x176"   :val = camera.FRAMESIZE_HQVGA
-		if resolution == b"QQVGA" or resolution == b"160x120"   :val = camera.FRAMESIZE_QQVGA
+		Camera.modified = True
+		val = FRAMESIZES.get(resolution)
 		if Camera.opened and val is not None:
 			# print("Framesize %s"%strings.tostrings(resolution))
 			camera.framesize(val)
@@ -338,16 +370,8 @@ class Camera:
 	@staticmethod
 	def pixformat(format_):
 		""" Change the format of image """
-		Camera.modified[0] = True
-		val = None
-		if format_ == b"RGB565"    : val=camera.PIXFORMAT_RGB565
-		if format_ == b"YUV422"    : val=camera.PIXFORMAT_YUV422
-		if format_ == b"GRAYSCALE" : val=camera.PIXFORMAT_GRAYSCALE
-		if format_ == b"JPEG"      : val=camera.PIXFORMAT_JPEG
-		if format_ == b"RGB888"    : val=camera.PIXFORMAT_RGB888
-		if format_ == b"RAW"       : val=camera.PIXFORMAT_RAW
-		if format_ == b"RGB444"    : val=camera.PIXFORMAT_RGB444
-		if format_ == b"RGB555"    : val=camera.PIXFORMAT_RGB555
+		Camera.modified = True
+		val = PIXFORMATS.get(format_)
 		if Camera.opened and val is not None:
 			# print("Pixformat %s"%strings.tostrings(format_))
 			camera.pixformat(val)
@@ -357,65 +381,49 @@ class Camera:
 	@staticmethod
 	def quality(val=None, modified=True):
 		""" Configure the compression """
-		Camera.modified[0] = modified
+		Camera.modified = modified
 		if Camera.opened:
 			# print("Quality %d"%val)
 			return camera.quality(val)
 		return None
 
 	@staticmethod
-	def brightness(val=None):
-		""" Change the brightness """
-		Camera.modified[0] = True
+	def setting(name, val=None):
+		""" Change the camera setting with the name given (brightness, contrast, ...) """
+		Camera.modified = True
 		if Camera.opened:
-			# print("Brightness %d"%val)
-			return camera.brightness(val)
+			return getattr(camera, name)(val)
 		return None
 
+	@staticmethod
+	def brightness(val=None):
+		""" Change the brightness """
+		return Camera.setting("brightness", val)
+
 	@staticmethod
 	def contrast(val=None):
 		""" Change the contrast """
-		Camera.modified[0] = True
-		if Camera.opened:
-			# print("Contrast %d"%val)
-			return camera.contrast(val)
-		return None
+		return Camera.setting("contrast", val)
 
 	@staticmethod
 	def saturation(val=None):
 		""" Change the saturation """
-		Camera.modified[0] = True
-		if Camera.opened:
-			# print("Saturation %d"%val)
-			return camera.saturation(val)
-		return None
+		return Camera.setting("saturation", val)
 
 	@staticmethod
 	def sharpness(val=None):
 		""" Change the sharpness """
-		Camera.modified[0] = True
-		if Camera.opened:
-			# print("Sharpness %d"%val)
-			return camera.sharpness(val)
-		return None
+		return Camera.setting("sharpness", val)
 
 	@staticmethod
 	def hmirror(val=None):
 		""" Set horizontal mirroring """
-		Camera.modified[0] = True
-		if Camera.opened:
-			# print("Hmirror %d"%val)
-			return camera.hmirror(val)
-		return None
+		return Camera.setting("hmirror", val)
 
 	@staticmethod
 	def vflip(val=None):
 		""" Set the vertical flip """
-		Camera.modified[0] = True
-		if Camera.opened:
-			# print("Vflip %d"%val)
-			return camera.vflip(val)
-		return None
+		return Camera.setting("vflip", val)
 
 	@staticmethod
 	def configure(config):
@@ -424,17 +432,20 @@ class Camera:
 			Camera.pixformat (config.pixformat)
 			Camera.framesize (config.framesize)
 			Camera.quality   (config.quality)
-			Camera.brightness(config.brightness)
-			Camera.contrast  (config.contrast)
-			Camera.saturation(config.saturation)
-			Camera.hmirror   (config.hmirror)
-			Camera.vflip     (config.vflip)
+			for name in ("brightness","contrast","saturation","hmirror","vflip"):
+				Camera.setting(name, getattr(config, name))
 			Camera.flash     (config.flash_level)
 
 	@staticmethod
 	def get_config():
 		""" Reload configuration if it changed """
 		if Camera.config is None:
+			try:
+				# pylint: disable=no-member
+				# Collect automatically before the heap is exhausted
+				gc.threshold(gc.mem_free() // 4)
+			except AttributeError:
+				pass
 			Camera.config = CameraConfig()
 			if Camera.config.load() is False:
 				Camera.config.save()
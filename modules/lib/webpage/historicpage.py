@@ -9,16 +9,8 @@ from motion            import Historic
 from video             import Camera
 from tools             import lang,info, strings
 
-@HttpServer.add_route(b'/historic', menu=lang.menu_motion, item=lang.item_historic, available=info.iscamera() and Camera.is_activated())
-async def historic(request, response, args):
-	""" Historic motion detection page """
-	Historic.get_root()
-	if len(request.params) == 0:
-		detailled = False
-	else:
-		detailled = True
-	pageContent = [\
-		Tag(b"""
+# Constant parts of the page, kept in flash when frozen, the language text and the detailled flag are inserted between them
+HISTORIC_BEGIN = b"""
 		<script type='text/javascript'>
 
 		document.onkeydown = check_key;
@@ -30,9 +22,6 @@ async def historic(request, response, args):
 		var last_id = 0;
 		var previousId = 0;
 		var historic_request = new XMLHttpRequest();
-		var image_request    = new XMLHttpRequest();
-
-		setInterval(show, 200);
 
 		const MOTION_FILENAME =0;
 		const MOTION_WIDTH    =1;
@@ -81,54 +70,79 @@ async def historic(request, response, args):
 			if (historic.length > 0)
 			{
 				var motion = historic[last_id];
-				image_request.onreadystatechange = image_loaded;
-				image_request.open("GET","/historic/images/" + motion[MOTION_FILENAME],true);
-				image_request.send();
+				var image = new Image();
+				image.onload = image_loaded;
+				image.id     = last_id;
+				image.width  = motion[MOTION_WIDTH] /15;
+				image.height = motion[MOTION_HEIGHT]/15;
+				image.alt    = get_name(motion[MOTION_FILENAME]);
+				image.title  = get_name(motion[MOTION_FILENAME]);
+				image.style  = "padding: 1px;";
+				image.onclick = e => 
+					{
+						click_motion(parseInt(e.target.id,10));
+					};
+				image.src    = "/historic/images/" + motion[MOTION_FILENAME];
 			}
 			else
 			{
 				var ctx = document.getElementById('motion').getContext('2d');
 				ctx.font = '25px Arial';
 				ctx.fillStyle = "black";
-				ctx.fillText("%s", 10, 20);
+				ctx.fillText(\""""
+
+HISTORIC_MIDDLE = b"""\", 10, 20);
 			}
 		}
 
-		function image_loaded()
+		function image_loaded(e)
 		{
-			if (image_request.readyState === XMLHttpRequest.DONE)
+			var image = e.target;
+			var motion = historic[last_id];
+			images.push(image);
+			compute_edges(motion);
+			document.getElementById('motions').appendChild(image);
+			last_id = last_id + 1;
+			if (last_id == 1)
 			{
-				if (image_request.status === 200)
+				show_motion(current_id);
+			}
+			if (last_id < historic.length-1)
+			{
+				setTimeout(load_image, 1);
+			}
+		}
+
+		// Compute once the borders between the squares with and without detection
+		function compute_edges(motion)
+		{
+			var squarex = motion[MOTION_SQUAREX];
+			var squarey = motion[MOTION_SQUAREY];
+			var maxx = motion[MOTION_WIDTH] /squarex;
+			var maxy = motion[MOTION_HEIGHT]/squarey;
+			var diffs = motion[MOTION_DIFFS];
+			var x;
+			var y;
+
+			// Flat list of segments x1,y1,x2,y2 in pixels
+			motion.edges = [];
+			for (y = 0; y < maxy; y ++)
+			{
+				for (x = 0; x < maxx; x ++)
 				{
-					var motion = historic[last_id];
-					var image = new Image();
-					image.id     = last_id;
-					image.src    = 'data:image/jpeg;base64,' + image_request.response;
-					image.width  = motion[MOTION_WIDTH] /15;
-					image.height = motion[MOTION_HEIGHT]/15;
-					image.alt    = get_name(motion[MOTION_FILENAME]);
-					image.title  = get_name(motion[MOTION_FILENAME]);
-					image.style  = "padding: 1px;";
-					image.onclick = e => 
-						{
-							click_motion(parseInt(e.target.id,10));
-						};
-					images.push(image);
-					document.getElementById('motions').appendChild(image);
-					last_id = last_id + 1;
-					if (last_id < historic.length-1)
+					var detection = diffs[y*maxx + x];
+					if (x >= 1 && diffs[y*maxx + x -1] != detection)
+					{
+						motion.edges.push(x*squarex, y*squarey, x*squarex, y*squarey + squarey);
+					}
+					if (y >= 1 && diffs[(y-1)*maxx + x] != detection)
 					{
-						setTimeout(load_image, 1);
+						motion.edges.push(x*squarex, y*squarey, x*squarex + squarex, y*squarey);
 					}
 				}
 			}
 		}
 
-		function show()
-		{
-			show_motion(current_id);
-		}
-
 		function show_motion(id)
 		{
 			var motion = historic[id];
@@ -150,7 +164,9 @@ async def historic(request, response, args):
 			var maxx = motion[MOTION_WIDTH] /squarex;
 			var maxy = motion[MOTION_HEIGHT]/squarey;
 			
-			if (%d)
+			if ("""
+
+HISTORIC_END = b""")
 			{
 				for (y = 0; y < maxy; y ++)
 				{
@@ -167,47 +183,19 @@ async def historic(request, response, args):
 			}
 
 			ctx.strokeStyle = "red";
-			for (y = 0; y < maxy; y ++)
+			ctx.beginPath();
+			var edges = motion.edges;
+			for (var i = 0; i < edges.length; i += 4)
 			{
-				for (x = 0; x < maxx; x ++)
-				{
-					var detection = motion[MOTION_DIFFS][y*maxx + x];
-					if (x >= 1)
-					{
-						var previous = motion[MOTION_DIFFS][y*maxx + x -1];
-						if (previous != detection)
-						{
-							ctx.beginPath();
-							ctx.moveTo(offsetX + x*squarex, offsetY + y*squarey);
-							ctx.lineTo(offsetX + x*squarex, offsetY + y*squarey + squarey);
-							ctx.stroke();
-						}
-					}
-				}
-			}
-			
-			for (x = 0; x < maxx; x ++)
-			{
-				for (y = 0; y < maxy; y ++)
-				{
-					var detection = motion[MOTION_DIFFS][y*maxx + x];
-					if (y >= 1)
-					{
-						var previous = motion[MOTION_DIFFS][(y-1)*maxx + x];
-						if (previous != detection)
-						{
-							ctx.beginPath();
-							ctx.moveTo(offsetX + x*squarex, offsetY + y*squarey);
-							ctx.lineTo(offsetX + x*squarex + squarex, offsetY + y*squarey);
-							ctx.stroke();
-						}
-					}
-				}
+				ctx.moveTo(offsetX + edges[i],   offsetY + edges[i+1]);
+				ctx.lineTo(offsetX + edges[i+2], offsetY + edges[i+3]);
 			}
+			ctx.stroke();
 
 			// Show text image
 			ctx.font = '20px monospace';
 			ctx.fillStyle = "white";
+			ctx.beginPath();
 			ctx.rect(0, offsetY + motion[MOTION_HEIGHT],  motion[MOTION_WIDTH], 100);
 			ctx.fill();
 
@@ -475,11 +463,20 @@ async def historic(request, response, args):
 		}
 
 		</script>
-		<canvas id="motion" width="%d" height="%d" ></canvas>
+		<canvas id="motion" width="880" height="680" ></canvas>
 		<br>
 		<div id="motions"></div>
-		"""%(lang.historic_not_available, detailled, 800+40+40,600+40+40)),
-	]
+		"""
+
+@HttpServer.add_route(b'/historic', menu=lang.menu_motion, item=lang.item_historic, available=info.iscamera() and Camera.is_activated())
+async def historic(request, response, args):
+	""" Historic motion detection page """
+	Historic.get_root()
+	if len(request.params) == 0:
+		detailled = False
+	else:
+		detailled = True
+	pageContent = [Tag([HISTORIC_BEGIN, lang.historic_not_available, HISTORIC_MIDDLE, b"1" if detailled else b"0", HISTORIC_END])]
 	page = main_frame(request, response, args,lang.last_motion_detections,pageContent)
 	await response.send_page(page)
 
@@ -488,19 +485,18 @@ async def historic_json(request, response, args):
 	""" Send historic json file """
 	Server.slow_down()
 	if await Historic.locked() is False:
-		await response.send_buffer(b"historic.json", await Historic.get_json())
+		await response.send_json(await Historic.get_items())
 	else:
-		await response.send_buffer(b"historic.json", b"[]")
+		await response.send_json([])
 
-@HttpServer.add_route(b'/historic/images/.*', available=info.iscamera() and Camera.is_activated())
-async def historic_image(request, response, args):
-	""" Send historic image """
+async def send_historic_file(request, response, prefix):
+	""" Send the historic file requested """
 	Server.slow_down()
 	reserved = await Camera.reserve(Historic, timeout=5, suspension=15)
 	try:
 		if reserved:
 			await Historic.acquire()
-			await response.send_file(strings.tostrings(request.path[len("/historic/images/"):]), base64=True)
+			await response.send_file(strings.tostrings(request.path[len(prefix):]), base64=False)
 		else:
 			await response.send_error(status=b"404", content=b"Image not found")
 	finally:
@@ -508,18 +504,12 @@ async def historic_image(request, response, args):
 			await Historic.release()
 			await Camera.unreserve(Historic)
 
+@HttpServer.add_route(b'/historic/images/.*', available=info.iscamera() and Camera.is_activated())
+async def historic_image(request, response, args):
+	""" Send historic image """
+	await send_historic_file(request, response, "/historic/images/")
+
 @HttpServer.add_route(b'/historic/download/.*', available=info.iscamera() and Camera.is_activated())
 async def download_image(request, response, args):
 	""" Download historic image """
-	Server.slow_down()
-	reserved = await Camera.reserve(Historic, timeout=5, suspension=15)
-	try:
-		if reserved:
-			await Historic.acquire()
-			await response.send_file(strings.tostrings(request.path[len("/historic/download/"):]), base64=False)
-		else:
-			await response.send_error(status=b"404", content=b"Image not found")
-	finally:
-		if reserved:
-			await Historic.release()
-			await Camera.unreserve(Historic)
+	await send_historic_file(request, response, "/historic/download/")
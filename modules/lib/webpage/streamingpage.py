@@ -89,7 +89,7 @@ async def camera_start_streaming(request, response, args):
 		reserved = await Camera.reserve(request, timeout=20, suspension=15)
 		# print("Start streaming %d"%currentstreaming_id)
 		if reserved:
-			Camera.open()
+			await Camera.open()
 
 			response.set_status(b"200")
 			response.set_header(b"Content-Type"               ,b"multipart/x-mixed-replace")
@@ -9,3 +9,4 @@ from wifi.ip import *
 
 
 AUTHMODE = {0: b"open", 1: b"WEP", 2: b"WPA-PSK", 3: b"WPA2-PSK", 4: b"WPA/WPA2-PSK"}
+AUTHMODE_BY_NAME = {name: number for number, name in AUTHMODE.items()}
@@ -4,6 +4,9 @@
 from wifi import hostname, ip
 from tools import jsonconfig,strings,logger
 
+# Addresses of access point, in the order of wlan.ifconfig()
+ADDRESS_FIELDS = ("ip_address","netmask","gateway","dns")
+
 class AccessPointConfig(jsonconfig.JsonConfig):
 	""" Access point configuration class """
 	def __init__(self):
@@ -23,16 +26,18 @@ class AccessPointConfig(jsonconfig.JsonConfig):
 		# Get network address
 		ip_address, netmask, gateway, dns = AccessPoint.wlan.ifconfig()
 
-		result = "%s:\n"%strings.tostrings(self.__class__.__name__)
-		result +="   Ip address :%s\n"%ip_address
-		result +="   Netmask    :%s\n"%netmask
-		result +="   Gateway    :%s\n"%gateway
-		result +="   Dns        :%s\n"%dns
-		result +="   Ssid       :%s\n"%strings.tostrings(self.ssid)
-		result +="   Password   :%s\n"%strings.tostrings(self.wifi_password)
-		result +="   Authmode   :%s\n"%strings.tostrings(self.authmode)
-		result +="   Activated  :%s\n"%strings.tostrings(self.activated)
-		return result
+		return \
+			"%s:\n"\
+			"   Ip address :%s\n"\
+			"   Netmask    :%s\n"\
+			"   Gateway    :%s\n"\
+			"   Dns        :%s\n"\
+			"   Ssid       :%s\n"\
+			"   Password   :%s\n"\
+			"   Authmode   :%s\n"\
+			"   Activated  :%s\n"%(self.__class__.__name__, ip_address, netmask, gateway, dns,
+				strings.tostrings(self.ssid), strings.tostrings(self.wifi_password),
+				strings.tostrings(self.authmode), strings.tostrings(self.activated))
 
 class AccessPoint:
 	""" Class to manage access point """
@@ -42,17 +47,13 @@ class AccessPoint:
 	@staticmethod
 	def open(ssid=None, password=None, authmode=None):
 		""" Open access point """
-		from wifi import AUTHMODE
+		from wifi import AUTHMODE_BY_NAME
 		# pylint:disable=multiple-statements
 		if ssid     is not None: AccessPoint.config.ssid         = strings.tobytes(ssid)
 		if password is not None: AccessPoint.config.wifi_password = strings.tobytes(password)
 		if authmode is not None: AccessPoint.config.authmode     = strings.tobytes(authmode)
 
-		authmode = 3
-		for authmode_num, authmode_name in AUTHMODE.items():
-			if authmode_name == AccessPoint.config.authmode:
-				authmode = authmode_num
-				break
+		authmode = AUTHMODE_BY_NAME.get(AccessPoint.config.authmode, 3)
 		AccessPoint.wlan.active(True) # IMPORTANT : Activate before configure
 		AccessPoint.wlan.config(\
 			essid    = strings.tostrings(AccessPoint.config.ssid),
@@ -65,7 +66,7 @@ class AccessPoint:
 		if AccessPoint.config is None:
 			AccessPoint.config = AccessPointConfig()
 			if AccessPoint.config.load() is False:
-				AccessPoint.config.ssid           = b"esp%05d"%hostname.Hostname.get_number()
+				AccessPoint.config.ssid           = hostname.Hostname.get_default()
 				AccessPoint.config.wifi_password  = b"Pycam_%05d"%hostname.Hostname.get_number()
 				AccessPoint.config.save()
 				logger.syslog("Access point not initialized")
@@ -108,26 +109,20 @@ class AccessPoint:
 		if gateway    is not None: AccessPoint.config.gateway    = strings.tobytes(gateway)
 		if dns        is not None: AccessPoint.config.dns        = strings.tobytes(dns)
 
-		if AccessPoint.config.ip_address == b"": AccessPoint.config.ip_address = strings.tobytes(AccessPoint.wlan.ifconfig()[0])
-		if AccessPoint.config.netmask    == b"": AccessPoint.config.netmask    = strings.tobytes(AccessPoint.wlan.ifconfig()[1])
-		if AccessPoint.config.gateway    == b"": AccessPoint.config.gateway    = strings.tobytes(AccessPoint.wlan.ifconfig()[2])
-		if AccessPoint.config.dns        == b"": AccessPoint.config.dns        = strings.tobytes(AccessPoint.wlan.ifconfig()[3])
-
-		if AccessPoint.config.ip_address == b"0.0.0.0": AccessPoint.config.ip_address = b""
-		if AccessPoint.config.netmask    == b"0.0.0.0": AccessPoint.config.netmask   = b""
-		if AccessPoint.config.gateway    == b"0.0.0.0": AccessPoint.config.gateway   = b""
-		if AccessPoint.config.dns        == b"0.0.0.0": AccessPoint.config.dns       = b""
+		config = AccessPoint.config
+		addresses = [getattr(config, field) for field in ADDRESS_FIELDS]
+		if b"" in addresses:
+			interface = AccessPoint.wlan.ifconfig()
+		for i in range(len(ADDRESS_FIELDS)):
+			if addresses[i] == b"":
+				addresses[i] = strings.tobytes(interface[i])
+			if addresses[i] == b"0.0.0.0":
+				addresses[i] = b""
+			setattr(config, ADDRESS_FIELDS[i], addresses[i])
 
 		try:
-			if AccessPoint.config.ip_address != b"" and \
-				AccessPoint.config.netmask   != b"" and \
-				AccessPoint.config.gateway   != b"" and \
-				AccessPoint.config.dns       != b"":
-				AccessPoint.wlan.ifconfig((
-					strings.tostrings(AccessPoint.config.ip_address),
-					strings.tostrings(AccessPoint.config.netmask),
-					strings.tostrings(AccessPoint.config.gateway),
-					strings.tostrings(AccessPoint.config.dns)))
+			if b"" not in addresses:
+				AccessPoint.wlan.ifconfig(tuple(strings.tostrings(address) for address in addresses))
 		except Exception as err:
 			logger.syslog(err, msg="Cannot configure wifi access point")
 
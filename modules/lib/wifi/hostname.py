@@ -6,6 +6,7 @@ from tools import strings
 class Hostname:
 	""" Manage the host name """
 	number = [None]
+	default = [None]
 
 	@staticmethod
 	def get_number():
@@ -20,3 +21,10 @@ class Hostname:
 			Hostname.number[0] = strings.compute_hash(mac)
 			del wlan
 		return Hostname.number[0]
+
+	@staticmethod
+	def get_default():
+		""" Get the default host name of device """
+		if Hostname.default[0] is None:
+			Hostname.default[0] = b"esp%05d"%Hostname.get_number()
+		return Hostname.default[0]
@@ -24,14 +24,13 @@ class NetworkConfig(jsonconfig.JsonConfig):
 		# Get network address
 		ip_address, netmask, gateway, dns = Station.wlan.ifconfig()
 
-		result = "%s:\n"%self.__class__.__name__
-		result +="   Ip address :%s\n"%ip_address
-		result +="   Netmask    :%s\n"%netmask
-		result +="   Gateway    :%s\n"%gateway
-		result +="   Dns        :%s\n"%dns
-		result +="   Ssid       :%s\n"%strings.tostrings(self.ssid)
-		# result +="   Password   :%s\n"%strings.tostrings(self.wifi_password)
-		return result
+		return \
+			"%s:\n"\
+			"   Ip address :%s\n"\
+			"   Netmask    :%s\n"\
+			"   Gateway    :%s\n"\
+			"   Dns        :%s\n"\
+			"   Ssid       :%s\n"%(self.__class__.__name__, ip_address, netmask, gateway, dns, strings.tostrings(self.ssid))
 
 	def save(self, file = None, part_filename=None):
 		""" Save wifi configuration """
@@ -51,18 +50,17 @@ class StationConfig(jsonconfig.JsonConfig):
 	def __init__(self):
 		""" Constructor """
 		jsonconfig.JsonConfig.__init__(self)
-		self.hostname      = b"esp%05d"%hostname.Hostname.get_number()
+		self.hostname      = hostname.Hostname.get_default()
 		self.activated     = True
 		self.fallback      = True
 		self.default       = b""
 
 	def __repr__(self):
 		""" Display the content of wifi station """
-		# Get network address
-		result = "%s:\n"%self.__class__.__name__
-		result +="   Activated  :%s\n"%strings.tostrings(self.activated)
-		result  ="   Hostname   :%s\n"%strings.tostrings(self.hostname)
-		return result
+		return \
+			"%s:\n"\
+			"   Activated  :%s\n"\
+			"   Hostname   :%s\n"%(self.__class__.__name__, strings.tostrings(self.activated), strings.tostrings(self.hostname))
 
 class Station:
 	""" Class to manage wifi station """
@@ -71,7 +69,7 @@ class Station:
 	network = None
 	other_networks = []
 	known_network = []
-	last_scan = [0]
+	last_scan = 0
 
 	@staticmethod
 	def init():
@@ -82,18 +80,25 @@ class Station:
 
 	@staticmethod
 	async def connect(network, max_retry=15):
-		""" Connect to wifi hotspot """
+		""" Connect to wifi hotspot, max_retry is the maximal waiting time in seconds """
 		Station.init()
 		result = False
 		if not Station.wlan.isconnected():
 			Station.wlan.active(True)
 			Station.configure(network)
 			Station.wlan.connect(strings.tobytes(network.ssid), strings.tobytes(network.wifi_password))
+			ssid = strings.tostrings(network.ssid)
+			# Poll often at first, the association usually takes one to three seconds
+			delay = 100
+			elapsed = 0
 			retry = 0
-			while not Station.wlan.isconnected() and retry < max_retry:
-				await uasyncio.sleep(1)
-				logger.syslog ("   %-2d/%d wait connection to %s"%(retry+1, max_retry, strings.tostrings(network.ssid)))
-				retry += 1
+			while not Station.wlan.isconnected() and elapsed < max_retry*1000:
+				await uasyncio.sleep_ms(delay)
+				elapsed += delay
+				delay = min(delay*3//2, 1000)
+				if elapsed >= (retry+1)*1000:
+					logger.syslog ("   %-2d/%d wait connection to %s"%(retry+1, max_retry, ssid))
+					retry += 1
 
 			if Station.wlan.isconnected() is False:
 				Station.wlan.active(False)
@@ -131,18 +136,20 @@ class Station:
 		Station.init()
 		# If ip is dynamic
 		if  network.dynamic   is True:
-			if len(Station.get_hostname()) > 0:
-				Station.wlan.config(dhcp_hostname= strings.tostrings(Station.get_hostname()))
+			hostname_ = Station.get_hostname()
+			if len(hostname_) > 0:
+				Station.wlan.config(dhcp_hostname= strings.tostrings(hostname_))
 		else:
 			try:
 				Station.wlan.ifconfig((strings.tostrings(network.ip_address),strings.tostrings(network.netmask),strings.tostrings(network.gateway),strings.tostrings(network.dns)))
 			except Exception as err:
 				logger.syslog(err, msg="Cannot configure wifi station")
 		try:
-			network.ip_address = strings.tobytes(Station.wlan.ifconfig()[0])
-			network.netmask   = strings.tobytes(Station.wlan.ifconfig()[1])
-			network.gateway   = strings.tobytes(Station.wlan.ifconfig()[2])
-			network.dns       = strings.tobytes(Station.wlan.ifconfig()[3])
+			ip_address, netmask, gateway, dns = Station.wlan.ifconfig()
+			network.ip_address = strings.tobytes(ip_address)
+			network.netmask   = strings.tobytes(netmask)
+			network.gateway   = strings.tobytes(gateway)
+			network.dns       = strings.tobytes(dns)
 		except Exception as err:
 			logger.syslog(err, msg="Cannot get ip station")
 
@@ -171,15 +178,18 @@ class Station:
 	def scan():
 		""" Scan other networks """
 		Station.init()
-		if Station.last_scan[0] + 120 < time.time() or len(Station.other_networks) == 0:
+		if Station.last_scan + 120 < time.time() or len(Station.other_networks) == 0:
 			Station.other_networks = []
 			Station.wlan.active(True)
 			try:
 				other_networks = Station.wlan.scan()
-				for ssid, bssid, channel, rssi, authmode, hidden in sorted(other_networks, key=lambda x: x[3], reverse=True):
+				other_networks.sort(key=lambda x: x[3], reverse=True)
+				Station.other_networks = [None]*len(other_networks)
+				for i in range(len(other_networks)):
+					ssid, bssid, channel, rssi, authmode, hidden = other_networks[i]
 					logger.syslog("Network detected %s"%strings.tostrings(ssid))
-					Station.other_networks.append((ssid, channel, authmode))
-				Station.last_scan[0] = time.time()
+					Station.other_networks[i] = (ssid, channel, authmode)
+				Station.last_scan = time.time()
 			except Exception as err:
 				logger.syslog("No network found")
 
@@ -201,11 +211,12 @@ class Station:
 		if network_name != b"":
 			# Load default network
 			if Station.network.load(part_filename=network_name):
-				logger.syslog("Try to connect to %s"%strings.tostrings(Station.network.ssid))
+				ssid = strings.tostrings(Station.network.ssid)
+				logger.syslog("Try to connect to %s"%ssid)
 
 				# If the connection failed
 				if await Station.connect(Station.network, max_retry) is True:
-					logger.syslog("Connected to %s"%strings.tostrings(Station.network.ssid))
+					logger.syslog("Connected to %s"%ssid)
 					print(repr(Station.config) + repr(Station.network))
 					Station.config.default = network_name
 					Station.config.save()
@@ -221,18 +232,17 @@ class Station:
 		if len(networks) > 0:
 			# List known networks
 			Station.known_network = Station.network.list_known()
+			detected = set(network[0] for network in networks)
 
 			# If the defaut network not yet initialized
 			if len(Station.config.default) == 0:
 				# For all known networks
 				for network_name in Station.known_network:
-					# Search in detected networks
-					for network in networks:
-						# If the known network is found in detected network
-						if network[0] == network_name:
-							result = await Station.select_network(network_name, max_retry)
-							if result is True:
-								break
+					# If the known network is found in detected network
+					if network_name in detected:
+						result = await Station.select_network(network_name, max_retry)
+						if result is True:
+							break
 
 			# If wifi not yet found
 			if result is False:
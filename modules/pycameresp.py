@@ -57,7 +57,7 @@ def create_camera_task(loop, device):
 				sdcard.SdCard.set_slot(slot=None) # No sdcard available
 
 			# Start camera before wifi to avoid problems
-			Camera.open()
+			loop.run_until_complete(Camera.open())
 
 			# Start motion detection
 			import motion
@@ -1,4 +1,7 @@
+import os
 import os.path
+import re
+from fnmatch import fnmatchcase, translate
 from zipfile import ZipFile, ZIP_DEFLATED 
 import sys
 import useful
@@ -27,22 +30,48 @@ excludeds = [
     "*/video/*",
     "*/uasyncio/*"]
 
-excludeds_shell = excludeds + [
+excludeds_shell = [
     "*/webpage/*",
     "*/server/*",
     "*/wifi/*",
     "*/htmltemplate/*"]
 
-useful.zip_dir("%s/delivery/shell.zip" % PYCAMERESP, MPY_DIRECTORY, ["*.mpy"], excludeds_shell, False, [["frozen_mpy", "lib"]])
-
-useful.zip_dir("%s/delivery/server.zip" % PYCAMERESP, MPY_DIRECTORY, ["*.mpy"], excludeds, False, [["frozen_mpy", "lib"]])
-z = ZipFile("%s/delivery/server.zip" % PYCAMERESP, "a", ZIP_DEFLATED)
-z.write(os.path.normpath("%s/modules/main.py" % PYCAMERESP), "main.py")
-z.write(os.path.normpath("%s/modules/pycameresp.py" % PYCAMERESP), "pycameresp.py")
-z.write(os.path.normpath("%s/modules/www/bootstrap.min.css" % PYCAMERESP), "www/bootstrap.min.css")
-z.write(os.path.normpath("%s/modules/www/bootstrap.min.js" % PYCAMERESP), "www/bootstrap.min.js")
-z.write(os.path.normpath("%s/modules/www/jquery.min.js" % PYCAMERESP), "www/jquery.min.js")
-z.write(os.path.normpath("%s/modules/www/popper.min.js" % PYCAMERESP), "www/popper.min.js")
-z.close()
+def compile_patterns(patterns):
+    """ Compile the list of patterns into a single regular expression """
+    return re.compile("|".join(translate(pattern) for pattern in patterns))
+
+def is_excluded(path, patterns):
+    """ Indicates if the path or its filename matches the compiled patterns """
+    return patterns.match(path) is not None or patterns.match(os.path.basename(path)) is not None
+
+excludeds_server_re = compile_patterns(excludeds)
+excludeds_shell_re  = compile_patterns(excludeds_shell)
+
+def scan_mpy(directory):
+    """ List all mpy files of the directory """
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            if fnmatchcase(filename, "*.mpy"):
+                yield os.path.join(dirpath, filename)
+
+# Build shell.zip and server.zip from a single scan, the shell is the server without network parts
+os.makedirs("%s/delivery" % PYCAMERESP, exist_ok=True)
+with ZipFile("%s/delivery/shell.zip" % PYCAMERESP, "w", ZIP_DEFLATED) as shell, \
+     ZipFile("%s/delivery/server.zip" % PYCAMERESP, "w", ZIP_DEFLATED) as server:
+    for source in scan_mpy(MPY_DIRECTORY):
+        if not is_excluded(source, excludeds_server_re):
+            destination = "lib/" + os.path.relpath(source, MPY_DIRECTORY)
+            server.write(source, destination)
+            if not is_excluded(source, excludeds_shell_re):
+                shell.write(source, destination)
+
+    for source, destination in [
+            ("modules/main.py",               "main.py"),
+            ("modules/pycameresp.py",         "pycameresp.py"),
+            ("modules/www/bootstrap.min.css", "www/bootstrap.min.css"),
+            ("modules/www/bootstrap.min.js",  "www/bootstrap.min.js"),
+            ("modules/www/jquery.min.js",     "www/jquery.min.js"),
+            ("modules/www/popper.min.js",     "www/popper.min.js")]:
+        server.write(os.path.normpath("%s/%s" % (PYCAMERESP, source)), destination)
 
 useful.zip_dir("%s/delivery/editor.zip" % PYCAMERESP, PY_DIRECTORY, ["*/editor*.py", "*/filesystem.py", "*/jsonconfig.py", "*/terminal.py", "*/logger.py", "*/useful.py", "*/strings.py", "*/fnmatch.py"], [], False, [["shell", "editor"], ["tools", "editor"], ["modules", ""]])
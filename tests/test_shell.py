@@ -0,0 +1,37 @@
+""" Tests of the shell commands, run on computer with the micropython simulation modules """
+import sys
+import os.path
+import unittest
+from unittest import mock
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "modules", "lib"), os.path.join(ROOT, "modules", "simul")]
+# pylint:disable=wrong-import-position
+from shell import shell
+
+class TestRmdir(unittest.TestCase):
+	""" Tests of the recursive rmdir """
+	def removed(self, directory):
+		""" Get the directories removed by a recursive rmdir """
+		removed = []
+		with mock.patch.object(shell.filesystem, "exists", return_value=True), \
+			mock.patch.object(shell, "removedir", side_effect=lambda path, **params: removed.append(path)):
+			shell.rmdir(directory, recursive=True)
+		return removed
+
+	def test_trailing_slash(self):
+		""" The trailing slash does not add empty parent """
+		self.assertEqual(self.removed("a/b/"), ["a/b", "a"])
+		self.assertEqual(self.removed("/a/b/"), ["/a/b", "/a"])
+
+	def test_double_slash(self):
+		""" The double slashes are collapsed """
+		self.assertEqual(self.removed("a//b"), ["a/b", "a"])
+		self.assertEqual(self.removed("//a//b"), ["/a/b", "/a"])
+
+	def test_root(self):
+		""" The root and the current directory are never removed """
+		self.assertEqual(self.removed("/"), [])
+		self.assertEqual(self.removed("."), [])
+
+if __name__ == "__main__":
+	unittest.main()
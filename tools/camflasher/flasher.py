@@ -33,6 +33,8 @@ class Flasher(threading.Thread):
 	CMD_UPLOAD_FROM_SERVER = 8
 	CMD_UPLOAD_FILES       = 10
 
+	KEYS_MAX_LENGTH        = 512
+
 	def __init__(self, stdout, directory):
 		""" Constructor with thread on serial port """
 		threading.Thread.__init__(self)
@@ -50,13 +52,31 @@ class Flasher(threading.Thread):
 
 	def run(self):
 		""" Thread core """
+		pending = None
 		while self.loop:
-			command, data = self.command.get()
+			if pending is None:
+				command, data = self.command.get()
+			else:
+				command, data = pending
+				pending = None
 			if command == self.CMD_QUIT:
 				self.stream_thread.quit()
 				self.loop = False
 			elif command == self.CMD_KEY_PRESSED:
-				self.stream_thread.write(data)
+				# Group the keys already queued to write them at once
+				keys = [data]
+				length = len(data)
+				while length < self.KEYS_MAX_LENGTH:
+					try:
+						pending = self.command.get_nowait()
+					except queue.Empty:
+						break
+					if pending[0] != self.CMD_KEY_PRESSED:
+						break
+					keys.append(pending[1])
+					length += len(pending[1])
+					pending = None
+				self.stream_thread.write(b"".join(keys))
 			elif command == self.CMD_DATA_RECEIVED:
 				print(self.decode(data), end="")
 			elif command == self.CMD_FLASH:
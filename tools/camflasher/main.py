@@ -29,20 +29,29 @@ sys.path.append("../../modules/lib/tools")
 
 try:
 	from PyQt6 import uic
-	from PyQt6.QtCore import QTimer, QEvent, Qt, QCoreApplication
+	from PyQt6.QtCore import QTimer, QEvent, Qt, QCoreApplication, QFileSystemWatcher
 	from PyQt6.QtWidgets import QMainWindow, QMenu, QApplication, QMessageBox, QErrorMessage
-	from PyQt6.QtGui import QCursor,QAction,QFont
+	from PyQt6.QtGui import QCursor,QAction
 except:
 	from PyQt5 import uic
-	from PyQt5.QtCore import QTimer, QEvent, Qt, QCoreApplication
+	from PyQt5.QtCore import QTimer, QEvent, Qt, QCoreApplication, QFileSystemWatcher
 	from PyQt5.QtWidgets import QMainWindow, QMenu, QApplication, QMessageBox, QErrorMessage, QAction
-	from PyQt5.QtGui import QCursor, QFont
+	from PyQt5.QtGui import QCursor
 
 from dialogs import *
 from serial.tools import list_ports
 from flasher import Flasher
 from qstdoutvt100 import QStdoutVT100
 
+# Period in seconds of the scan of serial ports, when no device change was notified
+PORTS_SCAN_PERIOD = 10
+
+# Windows message sent when a device is plugged or unplugged
+WM_DEVICECHANGE = 0x0219
+
+# Conversion of the characters of the text selected in the console before copying it into the clipboard
+COPY_TABLE = str.maketrans({"\xa0":" ", "\u2028":"\n"})
+
 class Ports:
 	""" List of all serial ports """
 	def __init__(self):
@@ -51,63 +60,58 @@ class Ports:
 		self.status = {}
 		self.config = settings.get_settings()
 		self.rts_dtr = self.config.value(settings.DEVICE_RTS_DTR,{})
+		self.keys = {}
 		for key in self.rts_dtr.keys():
 			self.status[key] = False
+			self.keys.setdefault(key[0], key)
 
 	def update(self, detected_ports):
 		""" Update ports with detected connected port """
 		result = False
+		added = False
 		connected = []
+		detected = set()
 
 		# For all ports connected
 		for detected_port in sorted(detected_ports):
 			# If current port is usb
 			if detected_port.hwid != "n/a" and detected_port.vid is not None:
 				key = (detected_port.device, detected_port.vid, detected_port.pid)
-				if key in self.status:
-					connected.append(detected_port.device)
-					if self.status[key] is False:
-						self.status[key] = True
-						result = True
-				else:
+				detected.add(key)
+				connected.append(detected_port.device)
+				if key not in self.status:
 					# Create new port
-					self.status[key] = True
 					self.rts_dtr[key] = False
-					self.config.setValue(settings.DEVICE_RTS_DTR,self.rts_dtr)
-					connected.append(detected_port.device)
+					self.keys.setdefault(key[0], key)
+					added = True
+				if self.status.get(key) is not True:
+					self.status[key] = True
 					result = True
 
-		# For all ports already registered
-		for key in self.status:
-			# For all ports connected
-			for detected_port in sorted(detected_ports):
-				# If port is yet connected
-				if key[0] == detected_port.device and key[1] == detected_port.vid and key[2] == detected_port.pid:
-					break
-			else:
-				# The port is disconnected
-				self.status[key] = False
-				result = True
+		if added:
+			self.config.setValue(settings.DEVICE_RTS_DTR,self.rts_dtr)
+
+		# For all ports registered but disconnected
+		for key in self.status.keys() - detected:
+			self.status[key] = False
+			result = True
 		if result is True:
 			return connected
 		return None
 
 	def get_rts_dtr(self, name):
 		""" Get the value of rts dtr for the selected port """
-		result = False
-		for key in self.rts_dtr:
-			if name == key[0]:
-				result = self.rts_dtr[key]
-				break
-		return result
+		key = self.keys.get(name)
+		if key is None:
+			return False
+		return self.rts_dtr[key]
 
 	def set_rts_dtr(self, name, value):
 		""" Set the value of rts dtr for the selected port """
-		for key in self.rts_dtr:
-			if name == key[0]:
-				self.rts_dtr[key] = value
-				self.config.setValue(settings.DEVICE_RTS_DTR,self.rts_dtr)
-				break
+		key = self.keys.get(name)
+		if key is not None:
+			self.rts_dtr[key] = value
+			self.config.setValue(settings.DEVICE_RTS_DTR,self.rts_dtr)
 
 class CamFlasher(QMainWindow):
 	""" Tools to flash the firmware of pycameresp """
@@ -127,7 +131,13 @@ class CamFlasher(QMainWindow):
 		self.title = self.windowTitle()
 		self.hide_size = 0
 		self.paused = False
+
+		# Resize of console delayed until the window stops moving
+		self.timer_resize_console = QTimer(singleShot=True, interval=100)
+		self.timer_resize_console.timeout.connect(self.resize_console)
+
 		# Select font
+		self.console_font = None
 		self.update_font()
 		config = settings.get_settings()
 		self.geometry_.setGeometry(config.value(settings.WIN_GEOMETRY, self.geometry_.geometry()))
@@ -137,6 +147,8 @@ class CamFlasher(QMainWindow):
 		self.window.output.installEventFilter(self)
 
 		self.flash_dialog = FlashDialog(self)
+		self.about_dialog = None
+		self.option_dialog = None
 
 		# Start stdout redirection vt100 console
 		self.window.output.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
@@ -172,6 +184,11 @@ class CamFlasher(QMainWindow):
 		self.resize_console()
 		self.window.output.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
 		self.window.output.customContextMenuRequested.connect(self.context_menu)
+		self.context = QMenu(self)
+		self.context_copy  = self.add_context_action("Copy",  self.copy)
+		self.context_paste = self.add_context_action("Paste", self.paste)
+		self.context_cls   = self.add_context_action("Cls",   self.cls)
+		self.context_pause = self.add_context_action("Pause", self.pause)
 		self.window.action_paste.triggered.connect(self.paste)
 		self.window.action_copy.triggered.connect(self.copy)
 		self.window.action_resume.setDisabled(True)
@@ -194,6 +211,13 @@ class CamFlasher(QMainWindow):
 		self.timer_refresh_console.timeout.connect(self.on_refresh_console)
 		self.timer_refresh_console.start()
 
+		# The serial ports are scanned when a device is plugged or unplugged, or periodically
+		self.ports_changed = True
+		self.ports_scan = 0
+		if os.path.isdir("/dev"):
+			self.devices_watcher = QFileSystemWatcher(["/dev"])
+			self.devices_watcher.directoryChanged.connect(self.on_devices_changed)
+
 		# Refresher of the list of serial port available
 		self.timer_refresh_port = QTimer(active=True, interval=1000)
 		self.timer_refresh_port.timeout.connect(self.on_refresh_port)
@@ -202,45 +226,40 @@ class CamFlasher(QMainWindow):
 	def update_font(self):
 		""" Update console font """
 		config = settings.get_settings()
-		font = QFont()
-		font.setFamily    (config.value(settings.FONT_FAMILY ,"Courier"))
-		font.setPointSize (int(config.value(settings.FONT_SIZE   ,12)))
-		self.window.output.setFont(font)
+		console_font = (config.value(settings.FONT_FAMILY ,"Courier"), int(config.value(settings.FONT_SIZE   ,12)))
+		if console_font == self.console_font:
+			return
+		self.console_font = console_font
+		self.window.output.setFont(get_font(*console_font))
+
+		# Calculate the dimension in pixels of a text of 200 lines with 200 characters
+		line = "W"*200 + "\n"
+		line = line*200
+		line = line[:-1]
+		self.text_size = self.window.output.fontMetrics().size(Qt.TextFlag.TextWordWrap,line)
 
 	def on_about_clicked(self):
 		""" About menu clicked """
-		about_dialog = AboutDialog(self)
-		about_dialog.show()
-		about_dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
-		about_dialog.exec()
+		if self.about_dialog is None:
+			self.about_dialog = AboutDialog(self)
+		self.about_dialog.show()
+		self.about_dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+		self.about_dialog.exec()
+
+	def add_context_action(self, text, slot):
+		""" Add an action to the context menu """
+		action = QAction(text, self)
+		action.triggered.connect(slot)
+		self.context.addAction(action)
+		return action
 
 	def context_menu(self, pos):
 		""" Customization of the context menu """
 		self.console.reset_pressed()
-		context = QMenu(self)
-
-		copy = QAction("Copy", self)
-		copy.triggered.connect(self.copy)
-		context.addAction(copy)
-
-		if self.paused is False:
-			paste = QAction("Paste", self)
-			paste.triggered.connect(self.paste)
-			context.addAction(paste)
-
-			cls = QAction("Cls", self)
-			cls.triggered.connect(self.cls)
-			context.addAction(cls)
-
-			pause = QAction("Pause", self)
-			pause.triggered.connect(self.pause)
-			context.addAction(pause)
-		else:
-			pause = QAction("Resume", self)
-			pause.triggered.connect(self.pause)
-			context.addAction(pause)
-
-		context.exec(QCursor.pos())
+		self.context_paste.setVisible(self.paused is False)
+		self.context_cls.setVisible(self.paused is False)
+		self.context_pause.setText("Resume" if self.paused else "Pause")
+		self.context.exec(QCursor.pos())
 
 	def pause(self):
 		""" Pause console display """
@@ -262,9 +281,7 @@ class CamFlasher(QMainWindow):
 	def copy(self):
 		""" Copy to clipboard the text selected """
 		text_selected = self.window.output.textCursor().selectedText()
-		text_selected = text_selected.replace("\xa0"," ")
-		text_selected = text_selected.replace("\u2028","\n")
-		QApplication.clipboard().setText(text_selected)
+		QApplication.clipboard().setText(text_selected.translate(COPY_TABLE))
 
 	def paste(self):
 		""" Paste to console the content of clipboard """
@@ -286,23 +303,15 @@ class CamFlasher(QMainWindow):
 
 	def resize_console(self):
 		""" Resize console """
-		# Save the position
 		config = settings.get_settings()
-		geometry = self.geometry_.geometry()
-		config.setValue(settings.WIN_GEOMETRY, geometry)
-
-		colors = config.value(settings.FIELD_COLORS, copy.deepcopy(vt100.DEFAULT_COLORS))
+		colors = config.value(settings.FIELD_COLORS, None)
+		if colors is None:
+			colors = copy.deepcopy(vt100.DEFAULT_COLORS)
 		self.console.set_colors(colors)
 
-		# Calculate the dimension in pixels of a text of 200 lines with 200 characters
-		line = "W"*200 + "\n"
-		line = line*200
-		line = line[:-1]
-		size = self.window.output.fontMetrics().size(Qt.TextFlag.TextWordWrap,line)
-
-		# Deduce the size of console visible in the window
-		width  = (self.window.output.contentsRect().width()  * 200)// size.width() -  2
-		height = int((self.window.output.contentsRect().height() * 200)/ size.height() - 0.3)
+		# Deduce the size of console visible in the window from the size of text computed with the font
+		width  = (self.window.output.contentsRect().width()  * 200)// self.text_size.width() -  2
+		height = int((self.window.output.contentsRect().height() * 200)/ self.text_size.height() - 0.3)
 
 		self.hide_size = 0
 		self.setWindowTitle("%s %dx%d"%(self.title, width, height))
@@ -310,11 +319,11 @@ class CamFlasher(QMainWindow):
 
 	def moveEvent(self, _):
 		""" Treat the window move event"""
-		self.resize_console()
+		self.timer_resize_console.start()
 
 	def resizeEvent(self, _):
 		""" Treat the window resize event """
-		self.resize_console()
+		self.timer_resize_console.start()
 
 	def on_tabs_link_changed(self):
 		""" The links tab has changed """
@@ -382,10 +391,13 @@ class CamFlasher(QMainWindow):
 
 	def on_option_clicked(self):
 		""" On option menu clicked """
-		option_dialog = OptionDialog(self)
-		option_dialog.show()
-		option_dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
-		result = option_dialog.exec()
+		if self.option_dialog is None:
+			self.option_dialog = OptionDialog(self)
+		else:
+			self.option_dialog.reload()
+		self.option_dialog.show()
+		self.option_dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+		result = self.option_dialog.exec()
 		if result == 1:
 			config = settings.get_settings()
 			self.flasher.set_directory(config.value(settings.WORKING_DIRECTORY,str(Path.home())))
@@ -400,17 +412,30 @@ class CamFlasher(QMainWindow):
 		if self.hide_size > 3:
 			self.setWindowTitle(self.title)
 
-		self.ports_connected = self.ports.update(list_ports.comports())
-		if self.ports_connected is not None:
-			for i in range(self.window.combo_port.count()):
-				if not self.window.combo_port.itemText(i) in self.ports_connected:
+		self.ports_scan += 1
+		if self.ports_changed is False and self.ports_scan < PORTS_SCAN_PERIOD:
+			ports_connected = None
+		else:
+			self.ports_changed = False
+			self.ports_scan = 0
+			ports_connected = self.ports.update(list_ports.comports())
+		if ports_connected is not None:
+			self.ports_connected = ports_connected
+			connected = set(self.ports_connected)
+			displayed = set()
+
+			# Remove the ports disconnected, from the end to keep the indexes valid
+			for i in range(self.window.combo_port.count()-1, -1, -1):
+				port = self.window.combo_port.itemText(i)
+				if port in connected:
+					displayed.add(port)
+				else:
 					self.window.combo_port.removeItem(i)
 
+			# Add the ports connected
 			for port in self.ports_connected:
-				for i in range(self.window.combo_port.count()):
-					if self.window.combo_port.itemText(i) == port:
-						break
-				else:
+				if port not in displayed:
+					displayed.add(port)
 					self.window.combo_port.addItem(port)
 
 		# Flash menu
@@ -420,6 +445,19 @@ class CamFlasher(QMainWindow):
 		else:
 			self.window.action_flash.setEnabled(True)
 
+	def on_devices_changed(self, _):
+		""" A device was added or removed """
+		self.ports_changed = True
+
+	if sys.platform == "win32":
+		def nativeEvent(self, event_type, message):
+			""" Detect the devices plugged or unplugged on windows """
+			if event_type == b"windows_generic_MSG":
+				import ctypes.wintypes
+				if ctypes.wintypes.MSG.from_address(int(message)).message == WM_DEVICECHANGE:
+					self.ports_changed = True
+			return super(CamFlasher, self).nativeEvent(event_type, message)
+
 	def set_state_serial(self):
 		""" Set serial state """
 		# Serial config
@@ -622,8 +660,14 @@ class CamFlasher(QMainWindow):
 		""" Refresh the console content """
 		self.connection_state()
 
-		self.window.output.viewport().setProperty("cursor", QCursor(Qt.CursorShape.ArrowCursor))
-		cursor = self.window.output.textCursor()
+		viewport = self.window.output.viewport()
+		if viewport.cursor().shape() != Qt.CursorShape.ArrowCursor:
+			viewport.setProperty("cursor", QCursor(Qt.CursorShape.ArrowCursor))
+
+		# Nothing to display if the console has not been modified
+		modified = self.console.is_modified()
+		if modified:
+			cursor = self.window.output.textCursor()
 		if self.clear_selection is True:
 			self.cancel_selection()
 
@@ -634,7 +678,8 @@ class CamFlasher(QMainWindow):
 			self.cancel_selection()
 
 		# Refresh only if mouse is not in selection or if the console is not paused
-		if   cursor.hasSelection()         is False and \
+		if   modified                      is True  and \
+			cursor.hasSelection()         is False and \
 			self.paused                    is False:
 			output = self.console.refresh()
 
@@ -649,18 +694,23 @@ class CamFlasher(QMainWindow):
 		# Stop serial thread
 		self.flasher.quit()
 
+		# Save the position and write the settings to disk
+		config = settings.get_settings()
+		config.setValue(settings.WIN_GEOMETRY, self.geometry_.geometry())
+		config.sync()
+
 def except_hook(cls, exception, traceback):
 	""" Exception hook """
 	from traceback import extract_tb
 	msg = QErrorMessage()
 	msg.setModal(True)
-	text = '<code>' + str(exception) + "<br>"
+	text = ['<code>', str(exception), "<br>"]
 	for filename, line, method, content in extract_tb(traceback) :
-		text += '&nbsp;&nbsp;&nbsp;&nbsp;<FONT COLOR="#ff0000">File "%s", line %d, in %s</FONT><br>'%(filename,line,method)
-		text += '&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;%s<br>'%(content)
-	text += "</code>"
+		text.append('&nbsp;&nbsp;&nbsp;&nbsp;<FONT COLOR="#ff0000">File "%s", line %d, in %s</FONT><br>'%(filename,line,method))
+		text.append('&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;%s<br>'%(content))
+	text.append("</code>")
 	msg.resize(800, 400)
-	msg.showMessage(text)
+	msg.showMessage("".join(text))
 	msg.exec()
 	sys.__excepthook__(cls, exception, traceback)
 
@@ -208,11 +208,14 @@ class QStdoutVT100:
 		if self.pressed is False:
 			if self.vt100.is_modified():
 				self.qtextbrowser.setHtml(self.vt100.to_html())
-				for output in self.output:
-					result += output
+				result = "".join(self.output)
 				self.output = []
 		return result
 
+	def is_modified(self):
+		""" Indicates if the console must be refreshed """
+		return self.vt100.is_modified()
+
 	def set_colors(self, colors):
 		""" Change the default colors """
 		self.vt100.set_colors(colors)
@@ -225,23 +228,33 @@ class QStdoutVT100:
 		""" Test whether a file descriptor refers to a terminal """
 		return True
 
-	def convert_key_to_vt100(self, key_event):
-		""" Convert the key event qt into vt100 key """
-		result = None
-		key = key_event.key()
+	def get_modifier(self, key_event):
+		""" Get the keyboard modifiers of the key event without the keypad modifier """
 		try:
 			# PyQt6
-			modifier = key_event.keyCombination().keyboardModifiers() & ~Qt.KeyboardModifier.KeypadModifier
+			return key_event.keyCombination().keyboardModifiers() & ~Qt.KeyboardModifier.KeypadModifier
 		except:
 			# PyQt5
-			modifier = key_event.modifiers()& ~Qt.KeyboardModifier.KeypadModifier
+			return key_event.modifiers()& ~Qt.KeyboardModifier.KeypadModifier
+
+	def convert_key_to_vt100(self, key_event):
+		""" Convert the key event qt into vt100 key """
+		result = None
+		key = key_event.key()
+
+		# Printable characters which are not control letters are sent as is
+		if key < 65 or (key > 90 and key < 0x1000000):
+			return key_event.text().encode("utf-8")
+
+		# Main keys do not depend on modifiers
+		result = main_keys.get(key)
+		if result is not None:
+			return result
 
+		modifier = self.get_modifier(key_event)
 		if key >= 0x1000000:
-			# Manage main keys
-			if key in main_keys:
-				result = main_keys[key]
 			# Manage function keys
-			elif key in function_keys:
+			if key in function_keys:
 				normal, shift = function_keys[key]
 				if modifier & Qt.KeyboardModifier.ShiftModifier:
 					result = shift
@@ -268,7 +281,7 @@ class QStdoutVT100:
 					result = normal
 		else:
 			# If control letter pressed
-			if key >= 65 and key <= 90 and (modifier & Qt.KeyboardModifier.ControlModifier or modifier & Qt.KeyboardModifier.MetaModifier):
+			if modifier & Qt.KeyboardModifier.ControlModifier or modifier & Qt.KeyboardModifier.MetaModifier:
 				key -= 64
 				result = key.to_bytes(1,"little")
 			else:
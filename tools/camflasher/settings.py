@@ -21,15 +21,42 @@ DEVICE_RTS_DTR     = "camflasher.device.rts_dtr"
 FIELD_COLORS       = "camflasher.colors"
 TYPE_LINK          = "camflasher.link.type"
 
+class CachedSettings(QSettings):
+	""" Settings which keep in memory the values read, the values written are stored in memory and in settings """
+	def __init__(self, *args):
+		""" Constructor """
+		QSettings.__init__(self, *args)
+		self.cache = {}
+
+	def value(self, key, default=None):
+		""" Get the value of the key, the settings are only read once """
+		try:
+			return self.cache[key]
+		except KeyError:
+			if self.contains(key) is False:
+				return default
+			result = QSettings.value(self, key)
+			self.cache[key] = result
+			return result
+
+	def setValue(self, key, value):
+		""" Set the value of the key """
+		self.cache[key] = value
+		QSettings.setValue(self, key, value)
+
+settings_instance = None
+
 def get_settings():
-	""" Return the QSettings class according to the os """
-	if sys.platform == "darwin":
-		result = QSettings()
-	elif sys.platform == "win32":
-		if platform.uname() == "7":
-			result = QSettings(SETTINGS_FILENAME, QSettings.IniFormat)
+	""" Return the settings according to the os, it is created once and shared by all windows """
+	global settings_instance
+	if settings_instance is None:
+		if sys.platform == "darwin":
+			settings_instance = CachedSettings()
+		elif sys.platform == "win32":
+			if platform.uname() == "7":
+				settings_instance = CachedSettings(SETTINGS_FILENAME, QSettings.IniFormat)
+			else:
+				settings_instance = CachedSettings(SETTINGS_FILENAME)
 		else:
-			result = QSettings(SETTINGS_FILENAME)
-	else:
-		result = QSettings()
-	return result
\ No newline at end of file
+			settings_instance = CachedSettings()
+	return settings_instance
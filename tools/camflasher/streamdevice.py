@@ -3,12 +3,16 @@
 """ Stream class to communicate with the device """
 import os
 import os.path
+import atexit
 import threading
+import select
+import shutil
+import socket
 import queue
 import time
 import sys
-import telnetlib
 import tempfile
+import concurrent.futures
 import zipfile
 import serial
 import fileuploader
@@ -19,12 +23,17 @@ sys.path.append("../../modules/lib/tools")
 from exchange import FileReader, FileWriter, UploadCommand
 from filesystem import scandir, isdir
 
+# Conversion of the bytes logged into printable ascii characters
+PRINTABLE_TABLE = bytes(i if i >= 0x20 and i < 0x7F else 0x2E for i in range(256))
+
 class FileLogger:
 	""" Class to save and display all log """
 	def __init__(self, stdout, name):
 		""" Constructor """
 		if "-file" in sys.argv:
-			self.file = open("%s.log"%name,"w")
+			# The file is flushed when its buffer is full or at the exit
+			self.file = open("%s.log"%name,"w", buffering=65536)
+			atexit.register(self.file.close)
 		else:
 			self.file = None
 
@@ -33,19 +42,16 @@ class FileLogger:
 		else:
 			self.stdout = None
 
+		# Indicates if the logger is activated
+		self.enabled = self.file is not None or self.stdout is not None
+
 	def write(self, data):
 		""" Write data in the file or display """
 		if self.stdout is not None:
 			self.stdout.write(data)
-			self.stdout.flush()
 
 		if self.file is not None:
 			self.file.write(data)
-			self.file.flush()
-
-	def is_activated(self):
-		""" Indicates if the logger is activated """
-		return self.file is not None or self.stdout is not None
 
 class StreamLogger:
 	""" Log all data exchanged """
@@ -53,33 +59,27 @@ class StreamLogger:
 		""" Constructor """
 		self.received = b""
 		self.writer = FileLogger(stdout, name)
+		self.enabled = self.writer.enabled
 
 	def write(self, data):
 		""" Write buffer to logger """
+		if not self.enabled:
+			return
 		self.log("<-", self.received)
 		self.received = b""
 		self.log("->", data)
 
-	def insert_sep(self, string, sep, period):
-		""" Add separator in string """
-		return sep.join([string[i*period:(i+1)*period] for i in range(len(string)//period)])
-
 	def log(self, direction, buffer):
 		""" Log exchange on serial link """
-		if buffer != b"":
-			if self.writer.is_activated():
-				message = ""
-				for i in buffer:
-					if i >= 0x20 and  i < 0x7F:
-						message += chr(i)
-					else:
-						message += '.'
-				self.writer.write("# %s\n"%message)
-				data = self.insert_sep(buffer.hex().upper(), " ", 2)
-				self.writer.write("('%s',%-5d,'%s'),\n"%(direction, len(buffer),data))
+		if self.enabled and buffer != b"":
+			message = buffer.translate(PRINTABLE_TABLE).decode("ascii")
+			data = buffer.hex(" ").upper()
+			self.writer.write("# %s\n('%s',%-5d,'%s'),\n"%(message, direction, len(buffer), data))
 
 	def read(self, data):
 		""" Read data from logger """
+		if not self.enabled:
+			return data
 		if len(data) == 0:
 			self.log("<-", self.received)
 			self.received = b""
@@ -89,6 +89,9 @@ class StreamLogger:
 
 class StreamSerial(serial.Serial):
 	""" Stream serial with log exchange """
+	# Size of data written at once, it must fit in the input buffer of the device
+	WRITE_CHUNK = 256
+
 	def __init__(self, *args, **params):
 		if "stdout" in params:
 			stdout = params["stdout"]
@@ -113,72 +116,203 @@ class StreamSerial(serial.Serial):
 		""" Get the number of bytes in the input buffer """
 		return self.in_waiting
 
+	def read_waiting(self):
+		""" Read the bytes waiting, if there are none it waits the first byte until the read timeout """
+		waiting = self.in_waiting
+		if waiting > 0:
+			return self.read(waiting)
+
+		# The wait is interrupted by cancel_read when a command is sent
+		data = self.read(1)
+		if len(data) > 0:
+			waiting = self.in_waiting
+			if waiting > 0:
+				# Read the bytes arrived with the first one
+				data += self.read(waiting)
+		return data
+
+	def connect(self):
+		""" The serial link is opened at its creation """
+		return True
+
 	def is_opened(self):
 		""" Indicates if the serial link is opened """
 		return True
 
 class StreamTelnet:
 	""" Stream telnet with log exchange """
+	# The flow is controlled by tcp, the data is written at once
+	WRITE_CHUNK = None
+	# Maximal size of data received from the socket at once
+	RECEIVE_SIZE = 65536
+
+	# Telnet commands
+	IAC  = 255
+	DONT = 254
+	DO   = 253
+	WONT = 252
+	WILL = 251
+	SB   = 250
+	SE   = 240
+
 	def __init__(self, *args, **params):
 		self.host = params["host"]
 		self.port = params["port"]
-		self.telnet = telnetlib.Telnet()
+		self.socket = None
 		self.logger = StreamLogger(params["stdout"], self.__class__.__name__)
 		self.check = 0
-		self.received = b""
+		self.received = bytearray()
+		self.position = 0
+		# Telnet command being decoded
+		self.command = bytearray()
+		self.subnegotiation = False
+		# Socket pair used to interrupt the wait of data
+		self.wakeup_receiver, self.wakeup_sender = socket.socketpair()
+		self.wakeup_receiver.setblocking(False)
 
 	def write(self, data):
 		""" Write buffer to serial link """
 		self.logger.write(data)
-		return self.telnet.write(data)
+		if b"\xFF" in data:
+			# Escape the IAC bytes
+			data = data.replace(b"\xFF", b"\xFF\xFF")
+		self.socket.sendall(data)
 
-	def read(self, size=1):
-		""" Read length from serial link """
-		data = self.telnet.read_very_eager()
+	def receive(self):
+		""" Add the data received to the input buffer and return the end of data """
+		if select.select([self.socket], [], [], 0)[0]:
+			data = self.socket.recv(self.RECEIVE_SIZE)
+			if len(data) == 0:
+				raise EOFError("telnet connection closed")
+			elif len(self.command) > 0 or self.subnegotiation or b"\xFF" in data:
+				data = self.decode(data)
+			else:
+				# Remove the NUL and XON bytes, ignored in telnet
+				if b"\0" in data:
+					data = data.replace(b"\0", b"")
+				if b"\021" in data:
+					data = data.replace(b"\021", b"")
+		else:
+			data = b""
 		self.logger.read(data)
 		self.received += data
-		result = self.received[:size]
-		self.received = self.received[size:]
+		return len(self.received)
+
+	def decode(self, data):
+		""" Remove the telnet commands from the data received, all the options requested by the device are refused """
+		result = bytearray()
+		for byte in data:
+			if len(self.command) == 0:
+				if byte == self.IAC:
+					self.command.append(byte)
+				elif not self.subnegotiation and byte != 0 and byte != 0x11:
+					result.append(byte)
+			elif len(self.command) == 1:
+				if byte in (self.DO, self.DONT, self.WILL, self.WONT):
+					self.command.append(byte)
+				else:
+					self.command.clear()
+					if byte == self.IAC:
+						if not self.subnegotiation:
+							result.append(byte)
+					elif byte == self.SB:
+						self.subnegotiation = True
+					elif byte == self.SE:
+						self.subnegotiation = False
+			else:
+				# Option negotiation
+				if self.command[1] in (self.DO, self.DONT):
+					self.socket.sendall(bytes((self.IAC, self.WONT, byte)))
+				else:
+					self.socket.sendall(bytes((self.IAC, self.DONT, byte)))
+				self.command.clear()
+		return bytes(result)
+
+	def read(self, size=1):
+		""" Read length from serial link """
+		end = min(self.position + size, self.receive())
+		with memoryview(self.received) as received:
+			result = bytes(received[self.position:end])
+		self.consume(end)
 		return result
 
+	def consume(self, end):
+		""" Move the read position to the end of bytes read """
+		self.position = end
+
+		# Remove the bytes already read only when they take up most of the buffer
+		if self.position == len(self.received):
+			self.received.clear()
+			self.position = 0
+		elif self.position > 4096 and self.position*2 > len(self.received):
+			del self.received[:self.position]
+			self.position = 0
+
 	def cancel_read(self):
 		""" Cancel the read """
+		try:
+			self.wakeup_sender.send(b"\0")
+		except OSError:
+			pass
 
 	def reset_input_buffer(self):
 		""" Reset the input buffer """
-		self.received = b""
+		self.received.clear()
+		self.position = 0
 
 	def get_in_waiting(self):
 		""" Get the number of bytes in the input buffer """
-		if len(self.received) == 0:
-			if self.telnet.sock_avail():
-				return 1
-			else:
-				time.sleep(0.1)
-				return 0
-		else:
-			return len(self.received)
+		waiting = len(self.received) - self.position
+		if waiting == 0 and select.select([self.socket], [], [], 0)[0]:
+			return 1
+		return waiting
+
+	def read_waiting(self, timeout=0.1):
+		""" Read the bytes waiting, if there are none it waits the first byte until the timeout """
+		data = self.read(len(self.received) - self.position + 4096)
+		if len(data) == 0:
+			ready = select.select([self.socket, self.wakeup_receiver], [], [], timeout)[0]
+			if self.wakeup_receiver in ready:
+				# Read canceled
+				try:
+					self.wakeup_receiver.recv(256)
+				except OSError:
+					pass
+			elif len(ready) > 0:
+				data = self.read(4096)
+		return data
 
 	def close(self):
 		""" Close telnet connection """
-		if self.telnet is not None:
-			self.telnet.close()
+		if self.socket is not None:
+			self.socket.close()
+			self.socket = None
+		self.wakeup_sender.close()
+		self.wakeup_receiver.close()
 
 	def readinto(self, buffer):
 		""" Read bytes into buffer """
-		size = len(buffer)
-		data = self.read(size)
-		buffer[0:len(data)] = data
-		return len(data)
-
-	def is_opened(self):
-		""" Indicates if telnet connected """
+		end = min(self.position + len(buffer), self.receive())
+		length = end - self.position
+		with memoryview(self.received) as received:
+			buffer[0:length] = received[self.position:end]
+		self.consume(end)
+		return length
+
+	def connect(self):
+		""" Try to open the telnet connection and indicates if it succeeded """
 		try:
-			self.telnet.open(self.host,self.port, timeout=1)
+			self.socket = socket.create_connection((self.host,self.port), 1)
+			self.command.clear()
+			self.subnegotiation = False
 			return True
 		except Exception as err:
 			return False
 
+	def is_opened(self):
+		""" Indicates if telnet connected """
+		return self.socket is not None
+
 class StreamThread(threading.Thread):
 	""" Thread of the communication stream with the device """
 	DISCONNECTED      = 0
@@ -195,6 +329,10 @@ class StreamThread(threading.Thread):
 	CMD_UPLOAD_FROM_SERVER = 6
 	CMD_UPLOAD_FILES       = 8
 	CMD_QUIT               = 9
+
+	# Animation displayed while waiting the telnet connection
+	PROGRESS = (" |*-----|"," |-*----|"," |--*---|"," |---*--|", " |----*-|", " |-----*|")
+
 	def __init__(self, receive_callback, stdout):
 		""" Constructor """
 		threading.Thread.__init__(self)
@@ -210,6 +348,18 @@ class StreamThread(threading.Thread):
 		self.stdout = stdout
 		self.state = self.DISCONNECTED
 		self.zip_extract = False
+		# Commands treated when connected
+		self.handlers = {
+			self.CMD_WRITE_DATA         : self.on_write,
+			self.CMD_UPLOAD_FILE        : self.on_upload_file,
+			self.CMD_DONWLOAD_FILE      : self.on_download_file,
+			self.CMD_CONNECT_SERIAL     : self.on_connect_serial,
+			self.CMD_CONNECT_TELNET     : self.on_connect_telnet,
+			self.CMD_UPLOAD_FROM_SERVER : self.on_upload_from_server,
+			self.CMD_UPLOAD_FILES       : self.on_upload_files,
+			self.CMD_DISCONNECT         : self.on_disconnect,
+			self.CMD_QUIT               : self.on_quit,
+		}
 		self.start()
 
 	def __del__(self):
@@ -274,13 +424,13 @@ class StreamThread(threading.Thread):
 		""" Print message to console """
 		self.receive_callback(message + end)
 
-	def on_quit(self, command):
+	def on_quit(self, command, data=None):
 		""" Treat quit command """
 		if command == self.CMD_QUIT:
 			self.loop = False
 			self.close()
 
-	def on_disconnect(self, command):
+	def on_disconnect(self, command, data=None):
 		""" Treat disconnect command """
 		if command == self.CMD_DISCONNECT:
 			if self.state in [self.TELNET_CONNECTED, self.CONNECTING_TELNET]:
@@ -337,15 +487,7 @@ class StreamThread(threading.Thread):
 
 				# If the content of zip must be extracted
 				if self.zip_extract and os.path.splitext(filename_)[1].lower() == ".zip":
-					with zipfile.ZipFile(filename_,"r") as zip_file:
-						for file in zip_file.infolist():
-							zip_content = tempfile.NamedTemporaryFile(delete=False)
-							zip_content.write(zip_file.read(file.filename))
-							zip_content.close()
-							try:
-								file_writer.write(zip_content.name, self.stream, self.stream, file.filename, self.print)
-							finally:
-								os.unlink(zip_content.name)
+					self.uploader_zip(file_writer, filename_)
 				else:
 					file_writer.write(filename_, self.stream, self.stream, drop_filename, self.print)
 			self.stream.write(b"exit\r\n")
@@ -354,6 +496,39 @@ class StreamThread(threading.Thread):
 		except Exception as err:
 			self.print("Upload error")
 
+	def uploader_zip(self, file_writer, zip_filename):
+		""" Upload the content of zip, the next file is extracted while the current is uploaded """
+		with zipfile.ZipFile(zip_filename,"r") as zip_file:
+			with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+				files = zip_file.infolist()
+				extracted = None
+				try:
+					if len(files) > 0:
+						extracted = executor.submit(self.extract_zip_file, zip_file, files[0])
+					for index, file in enumerate(files):
+						content_filename = extracted.result()
+						extracted = None
+						if index + 1 < len(files):
+							extracted = executor.submit(self.extract_zip_file, zip_file, files[index + 1])
+						try:
+							file_writer.write(content_filename, self.stream, self.stream, file.filename, self.print)
+						finally:
+							os.unlink(content_filename)
+				finally:
+					# Remove the file extracted in advance if the upload failed
+					if extracted is not None:
+						try:
+							os.unlink(extracted.result())
+						except Exception as err:
+							pass
+
+	def extract_zip_file(self, zip_file, file):
+		""" Extract a file of zip into a temporary file and return its name """
+		with tempfile.NamedTemporaryFile(delete=False) as zip_content:
+			with zip_file.open(file) as content:
+				shutil.copyfileobj(content, zip_content)
+		return zip_content.name
+
 	def on_download_file(self, command, directory):
 		""" Treat the read file command """
 		if command == self.CMD_DONWLOAD_FILE:
@@ -432,22 +607,17 @@ class StreamThread(threading.Thread):
 			if self.stream is not None:
 				try:
 					if len(data) > 32:
+						chunk = self.stream.WRITE_CHUNK or len(data)
 						while len(data) > 0:
-							data_to_send = data[:8]
-							data = data[8:]
+							data_to_send = data[:chunk]
+							data = data[chunk:]
 							self.stream.write(data_to_send)
 							if len(data) > 0:
-								for i in range(15):
-									time.sleep(0.01)
-									if self.stream.get_in_waiting() > 0:
-										break
-								while self.stream.get_in_waiting() > 0:
-									self.receive_callback(self.stream.read(self.stream.get_in_waiting()))
-									if self.stream.get_in_waiting() == 0:
-										for i in range(15):
-											time.sleep(0.01)
-											if self.stream.get_in_waiting() > 0:
-												break
+								# Wait the echo of the device until it stops
+								received = self.stream.read_waiting()
+								while len(received) > 0:
+									self.receive_callback(received)
+									received = self.stream.read_waiting()
 					else:
 						self.stream.write(data)
 				except Exception as err:
@@ -457,7 +627,7 @@ class StreamThread(threading.Thread):
 		""" Receive data from serial """
 		if self.stream is not None:
 			try:
-				data = self.stream.read(self.stream.get_in_waiting() or 1)
+				data = self.stream.read_waiting()
 				self.receive_callback(data)
 			except Exception as err:
 				self.print("\n"+vt100.COLOR_FAILED+"Connection lost"+vt100.COLOR_NONE)
@@ -474,47 +644,48 @@ class StreamThread(threading.Thread):
 				self.state = self.CONNECTING_TELNET
 			elif self.state == self.CONNECTING_TELNET:
 				# If command awaited
-				if self.command.qsize() > 0:
-					# read command
-					command,data = self.command.get()
+				try:
+					command,data = self.command.get_nowait()
+				except queue.Empty:
+					command = None
+				if command is not None:
 					self.on_connect    (command, data)
 					self.on_disconnect (command)
 					self.on_quit       (command)
 				if self.stream is not None:
-					if self.stream.is_opened():
+					# The serial link is opened at its creation, the telnet connection is retried until it succeeds
+					if self.stream.is_opened() or self.stream.connect():
 						if isinstance(self.stream, StreamTelnet):
 							self.print(vt100.COLOR_OK+"Connected waiting for answer"+vt100.COLOR_NONE)
 							self.state = self.TELNET_CONNECTED
 						else:
 							self.state = self.SERIAL_CONNECTED
 					else:
-						progress = [" |*-----|"," |-*----|"," |--*---|"," |---*--|", " |----*-|", " |-----*|"]
-						self.print(progress[current%len(progress)], end="\r")
+						self.print(self.PROGRESS[current%len(self.PROGRESS)], end="\r")
 						current += 1
 						time.sleep(0.1)
 				else:
 					self.state = self.DISCONNECTED
 			elif self.state in [self.TELNET_CONNECTED, self.SERIAL_CONNECTED]:
 				# If command awaited
-				if self.command.qsize() > 0:
-					# read command
-					command,data = self.command.get()
-					self.on_write               (command, data)
-					self.on_upload_file         (command, data)
-					self.on_download_file       (command, data)
-					self.on_connect             (command, data)
-					self.on_upload_from_server  (command, data)
-					self.on_upload_files        (command, data)
-					self.on_disconnect          (command)
-					self.on_quit                (command)
+				try:
+					command,data = self.command.get_nowait()
+				except queue.Empty:
+					command = None
+				if command is not None:
+					handler = self.handlers.get(command)
+					if handler is not None:
+						handler(command, data)
 				self.receive()
 
 	def send(self, message):
 		""" Send message to stream thread """
 		self.command.put(message)
-		if self.stream is not None:
+		# The stream can be closed at the same time by the thread
+		stream = self.stream
+		if stream is not None:
 			try:
-				self.stream.cancel_read()
+				stream.cancel_read()
 			except:
 				pass
 